@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import run_report
+
+# Tranches d'ancienneté des montants impayés (jours)
+AGEING_BUCKETS = (30, 60, 90)
+
+
+def prepare(df):
+    """Normalise des transactions pour les calculs vectorisés.
+
+    Accepte le résultat de `Database.get_transactions()` en mode classique
+    (montant décimal) ou typé (montant en centimes) ; les soldes ne couvrent
+    tout l'historique qu'avec `include_archive=True`. Renvoie un DataFrame
+    avec `cents`, montant signé en centimes (recettes positives, charges
+    négatives) ; l'ordre des lignes est conservé.
+    """
+    if pd.api.types.is_integer_dtype(df['montant']):
+        cents = df['montant'].to_numpy(dtype=np.int64)
+    else:
+        cents = np.rint(pd.to_numeric(df['montant']).to_numpy(dtype=np.float64) * 100).astype(np.int64)
+    if isinstance(df['type'].dtype, pd.CategoricalDtype):
+        is_recette = np.asarray(df['type'].cat.categories == 'recette')[df['type'].cat.codes.to_numpy()]
+    else:
+        is_recette = df['type'].to_numpy() == 'recette'
+    return pd.DataFrame({
+        'id': df['id'].to_numpy() if 'id' in df else np.arange(len(df)),
+        'date': pd.to_datetime(df['date']),
+        'cents': np.where(is_recette, cents, -cents),
+        'type': df['type'].astype('category'),
+        'project': df['project'].astype('category') if 'project' in df else pd.Categorical([None] * len(df)),
+        'payer': df['payer'].astype('boolean').fillna(False).to_numpy(dtype=bool) if 'payer' in df else False,
+    })
+
+
+def _dh(cents):
+    """Convertit des centimes en dirhams."""
+    return cents / 100
+
+
+def running_balance(df):
+    """Solde cumulé après chaque transaction, dans l'ordre chronologique."""
+    tx = prepare(df).sort_values(['date', 'id'], kind='stable', ignore_index=True)
+    return pd.DataFrame({
+        'id': tx['id'],
+        'date': tx['date'],
+        'montant': _dh(tx['cents']),
+        'solde': _dh(tx['cents'].cumsum()),
+    })
+
+
+def daily_balance(df):
+    """Flux net et solde cumulé par jour."""
+    tx = prepare(df)
+    daily = tx.groupby('date', sort=True)['cents'].sum()
+    return pd.DataFrame({
+        'date': daily.index,
+        'flux': _dh(daily.to_numpy()),
+        'solde': _dh(daily.cumsum().to_numpy()),
+    })
+
+
+def cumulative_cash_flow_by_project(df, freq='M'):
+    """Flux net par période et par projet, avec son cumul par projet."""
+    tx = prepare(df)
+    tx = tx[tx['project'].notna()]
+    period = tx['date'].dt.to_period(freq)
+    flows = (tx.assign(period=period)
+             .groupby(['project', 'period'], observed=True, sort=True)['cents']
+             .sum()
+             .reset_index())
+    flows['cumul'] = flows.groupby('project', observed=True)['cents'].cumsum()
+    return pd.DataFrame({
+        'project': flows['project'],
+        'period': flows['period'].astype(str),
+        'flux': _dh(flows['cents']),
+        'cumul': _dh(flows['cumul']),
+    })
+
+
+def month_over_month(df):
+    """Charges, recettes et solde mensuels avec leurs variations d'un mois à l'autre."""
+    tx = prepare(df)
+    month = tx['date'].dt.to_period('M')
+    charges = (-tx['cents'].where(tx['cents'] < 0, 0)).groupby(month).sum()
+    recettes = tx['cents'].where(tx['cents'] > 0, 0).groupby(month).sum()
+    monthly = pd.DataFrame({'charges': charges, 'recettes': recettes})
+    # Les mois sans transaction apparaissent avec des montants nuls
+    if len(monthly):
+        monthly = monthly.reindex(pd.period_range(monthly.index.min(), monthly.index.max(), freq='M'), fill_value=0)
+    monthly['solde'] = monthly['recettes'] - monthly['charges']
+    out = _dh(monthly)
+    for column in ('charges', 'recettes', 'solde'):
+        out[f'{column}_delta'] = out[column].diff()
+        previous = out[column].shift()
+        out[f'{column}_evolution_pct'] = (out[f'{column}_delta'] / previous.abs().replace(0, np.nan)) * 100
+    out.index = out.index.astype(str)
+    return out.rename_axis('period').reset_index()
+
+
+def unpaid_ageing(df, as_of=None, buckets=AGEING_BUCKETS):
+    """Montants impayés par tranche d'ancienneté et par type."""
+    tx = prepare(df)
+    tx = tx[~tx['payer']]
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.today().normalize()
+    age = (as_of - tx['date']).dt.days.to_numpy()
+    labels = [f"0-{buckets[0]} j"] + [f"{a + 1}-{b} j" for a, b in zip(buckets, buckets[1:])] + [f"> {buckets[-1]} j"]
+    bucket = pd.Categorical.from_codes(np.searchsorted(np.asarray(buckets), age, side='left'), labels)
+    ageing = (pd.DataFrame({'tranche': bucket, 'type': tx['type'].to_numpy(), 'cents': np.abs(tx['cents'].to_numpy())})
+              .groupby(['tranche', 'type'], observed=False)['cents']
+              .agg(['sum', 'count'])
+              .reset_index())
+    return pd.DataFrame({
+        'tranche': ageing['tranche'],
+        'type': ageing['type'],
+        'montant': _dh(ageing['sum']),
+        'nb_transactions': ageing['count'],
+    })
+
+
+def show_analytics_section(db):
+    """Affiche les indicateurs de trésorerie calculés sur les transactions."""
+    with st.expander("📈 Analyse de trésorerie"):
+        # Le contenu d'un expander est exécuté même replié : la lecture des
+        # transactions n'a lieu qu'à la demande
+        if not st.toggle("Calculer l'analyse", key="analytics_enabled"):
+            return
+        # Lecture de tout l'historique, périodes archivées comprises : sans
+        # elles, les soldes repartiraient de zéro à la date d'archivage
+        df = run_report(db, db.get_transactions, typed=True, include_archive=True)
+        if df is None:
+            return
+        if df.empty:
+            st.info("Aucune transaction à analyser")
+            return
+
+        balance, projects, monthly, ageing = st.tabs(["Solde", "Projets", "Mois par mois", "Impayés"])
+        with balance:
+            st.line_chart(daily_balance(df), x='date', y='solde')
+        with projects:
+            flows = cumulative_cash_flow_by_project(df)
+            st.line_chart(flows, x='period', y='cumul', color='project')
+            st.dataframe(flows, hide_index=True)
+        with monthly:
+            st.dataframe(month_over_month(df), hide_index=True)
+        with ageing:
+            st.dataframe(unpaid_ageing(df), hide_index=True)
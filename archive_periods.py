@@ -0,0 +1,12 @@
+from database import Database
+
+def main():
+    db = Database()
+    try:
+        archived = db.archive_closed_periods()
+        print(f"Archivage terminé: {archived} transactions archivées")
+    except Exception as e:
+        print(f"Erreur: {str(e)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import re
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from database import Database, PREPARED_STATEMENTS
+
+
+def _plain_sql(name):
+    """Renvoie la requête du registre avec des paramètres psycopg2 classiques."""
+    return re.sub(r'\$\d+', '%s', PREPARED_STATEMENTS[name][1])
+
+
+def bench_prepared_statements(db, iterations=1000):
+    """Compare l'exécution des requêtes fréquentes, préparées ou non.
+
+    Renvoie la durée de chaque mode et le nombre de requêtes du parcours.
+
+    Les insertions sont faites dans une transaction annulée à la fin :
+    la base n'est pas modifiée.
+    """
+    db.ensure_connection()
+    with db.conn.cursor() as cur:
+        cur.execute("SELECT id FROM categories ORDER BY id LIMIT 1")
+        row = cur.fetchone()
+        if row is None:
+            raise ValueError("Au moins une catégorie est nécessaire pour le benchmark")
+        category_id = row[0]
+        workload = [
+            ('category_exists', (category_id,)),
+            ('insert_transaction', (date.today(), 10, "benchmark", category_id, 'charge', None, False)),
+            ('verify_login', ('admin', 'x' * 64)),
+        ]
+        for name, _ in workload:
+            db._prepare(cur, name)
+
+        results = {'statements': len(workload)}
+        for mode in ('plain', 'prepared'):
+            cur.execute("BEGIN")
+            start = time.perf_counter()
+            for _ in range(iterations):
+                for name, params in workload:
+                    if mode == 'prepared':
+                        db._execute_prepared(cur, name, params)
+                    else:
+                        cur.execute(_plain_sql(name), params)
+            results[mode] = time.perf_counter() - start
+            cur.execute("ROLLBACK")
+    return results
+
+
+def synthetic_transactions(rows, seed=0):
+    """Génère des transactions typées (montants en centimes) sur cinq ans."""
+    rng = np.random.default_rng(seed)
+    projects = pd.Categorical.from_codes(rng.integers(-1, 20, rows), [f"Projet {i}" for i in range(20)])
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1, dtype=np.int64),
+        'date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit='D'),
+        'montant': rng.integers(100, 1_000_000, rows, dtype=np.int64),
+        'type': pd.Categorical.from_codes(rng.integers(0, 2, rows), ['charge', 'recette']),
+        'project': projects,
+        'payer': rng.random(rows) < 0.8,
+    })
+
+
+def bench_analytics(rows=10_000_000):
+    """Mesure la durée de chaque calcul de trésorerie sur des données synthétiques."""
+    df = synthetic_transactions(rows)
+    as_of = df['date'].max()
+    workload = {
+        'running_balance': lambda: analytics.running_balance(df),
+        'daily_balance': lambda: analytics.daily_balance(df),
+        'cumulative_cash_flow_by_project': lambda: analytics.cumulative_cash_flow_by_project(df),
+        'month_over_month': lambda: analytics.month_over_month(df),
+        'unpaid_ageing': lambda: analytics.unpaid_ageing(df, as_of),
+    }
+    results = {}
+    for name, run in workload.items():
+        start = time.perf_counter()
+        run()
+        results[name] = time.perf_counter() - start
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la base de données")
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--analytics-rows', type=int,
+                        help="Mesure les calculs de trésorerie sur N transactions synthétiques (sans base)")
+    args = parser.parse_args()
+
+    if args.analytics_rows:
+        for name, elapsed in bench_analytics(args.analytics_rows).items():
+            print(f"{name:>32}: {elapsed:.3f}s")
+        return
+
+    db = Database()
+    results = bench_prepared_statements(db, args.iterations)
+    calls = args.iterations * results.pop('statements')
+    for mode, elapsed in results.items():
+        print(f"{mode:>9}: {elapsed:.3f}s ({elapsed / calls * 1e6:.1f} µs/requête)")
+    saving = 1 - results['prepared'] / results['plain']
+    print(f"Gain des requêtes préparées: {saving:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import functools
+import json
+import os
+import select
+import threading
+import time
+
+import pandas as pd
+import psycopg2
+
+# Canal NOTIFY sur lequel les écritures publient leurs changements
+CHANNEL = 'charges_changes'
+
+# Durée de vie maximale d'une entrée, en filet de sécurité (secondes)
+CACHE_TTL = float(os.environ.get('CACHE_TTL', 300))
+
+# Nombre maximal d'entrées en cache ; les plus anciennes sont écartées au-delà
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 256))
+
+# Nombre maximal de derniers résultats connus conservés pour les replis
+STALE_MAX_ENTRIES = int(os.environ.get('CACHE_STALE_MAX_ENTRIES', 32))
+
+_lock = threading.RLock()
+_entries = {}  # clé -> (valeur, dépendances, date d'expiration)
+_stale = {}  # clé -> dernière valeur connue (lectures avec repli), conservée après invalidation
+_generation = 0
+_last_change = 0.0
+_last_changes = {}  # table -> instant du dernier changement
+_last_clear = 0.0
+_listener = None
+_MISSING = object()
+
+
+def _copy(value):
+    """Évite que l'appelant ne modifie la valeur partagée du cache."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _matches(deps, table, keys):
+    """Indique si une entrée dépend des lignes modifiées.
+
+    Une dépendance (table, None) couvre toute la table ; une dépendance
+    (table, clé) n'est invalidée que si la clé figure parmi les clés modifiées.
+    """
+    for dep_table, dep_key in deps:
+        if dep_table == table and (keys is None or dep_key is None or dep_key in keys):
+            return True
+    return False
+
+
+def last_change(*tables):
+    """Instant (time.monotonic) du dernier changement observé dans ce processus.
+
+    Limité aux tables indiquées si elles sont fournies.
+    """
+    if not tables:
+        return _last_change
+    return max(_last_clear, *(_last_changes.get(table, 0.0) for table in tables))
+
+
+def invalidate(table, keys=None):
+    """Invalide les lectures en cache qui dépendent de la table (et des clés)."""
+    global _generation, _last_change
+    keys = set(keys) if keys is not None else None
+    with _lock:
+        _generation += 1
+        _last_change = time.monotonic()
+        _last_changes[table] = _last_change
+        for key in [k for k, (_, deps, _) in _entries.items() if _matches(deps, table, keys)]:
+            del _entries[key]
+
+
+def clear():
+    """Vide entièrement le cache."""
+    global _generation, _last_change, _last_clear
+    with _lock:
+        _generation += 1
+        _last_change = _last_clear = time.monotonic()
+        _entries.clear()
+        _stale.clear()
+
+
+def _store(key, entry):
+    """Ajoute une entrée en écartant les entrées expirées puis, au-delà de
+    CACHE_MAX_ENTRIES, les plus anciennes. À appeler avec `_lock` détenu."""
+    now = time.monotonic()
+    for expired in [k for k, (_, _, expires) in _entries.items() if expires <= now]:
+        del _entries[expired]
+    _entries.pop(key, None)
+    _entries[key] = entry
+    while len(_entries) > CACHE_MAX_ENTRIES:
+        del _entries[next(iter(_entries))]
+
+
+def _degraded(value):
+    """Indique si la valeur est un résultat dégradé, à ne pas mettre en cache."""
+    return isinstance(value, pd.DataFrame) and 'degraded' in value.attrs
+
+
+def cached_read(*tables, deps=None, fallback_errors=()):
+    """Met en cache le résultat d'une méthode de lecture de `Database`.
+
+    Les dépendances sont les tables listées, ou celles renvoyées par `deps`
+    appelé avec les arguments de la méthode, sous forme de couples (table, clé).
+    Si la méthode lève une des `fallback_errors`, la dernière valeur connue
+    est renvoyée (marquée `attrs['degraded'] = 'cache'`) quand elle existe.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            # Dans une unité de travail, les lectures voient des données non
+            # validées : elles ne doivent ni lire ni alimenter le cache partagé
+            if getattr(self, '_tx_depth', 0):
+                return method(self, *args, **kwargs)
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            with _lock:
+                entry = _entries.get(key, _MISSING)
+                if entry is not _MISSING and entry[2] > time.monotonic():
+                    return _copy(entry[0])
+                generation = _generation
+
+            try:
+                value = method(self, *args, **kwargs)
+            except fallback_errors as e:
+                with _lock:
+                    stale = _stale.get(key, _MISSING)
+                if stale is _MISSING or not isinstance(stale, pd.DataFrame):
+                    raise
+                print(f"{method.__name__}: dernier résultat connu renvoyé ({str(e).strip()})")
+                value = stale.copy()
+                value.attrs['degraded'] = 'cache'
+                return value
+            if _degraded(value):
+                return value
+            entry_deps = deps(*args, **kwargs) if deps else {(table, None) for table in tables}
+            with _lock:
+                # Une écriture survenue pendant la lecture rendrait la valeur périmée
+                if generation == _generation:
+                    _store(key, (value, frozenset(entry_deps), time.monotonic() + CACHE_TTL))
+                if fallback_errors:
+                    _stale.pop(key, None)
+                    _stale[key] = value
+                    # Les plus anciens résultats sont écartés au-delà de la limite
+                    while len(_stale) > STALE_MAX_ENTRIES:
+                        del _stale[next(iter(_stale))]
+            return _copy(value)
+        return wrapper
+    return decorator
+
+
+def publish(cur, table, keys=None):
+    """Publie un changement via NOTIFY et invalide le cache local."""
+    payload = json.dumps({'table': table, 'keys': list(keys) if keys is not None else None})
+    # NOTIFY limite la charge utile à 8000 octets : au-delà, toute la table est invalidée
+    if len(payload) >= 8000:
+        keys = None
+        payload = json.dumps({'table': table, 'keys': None})
+    cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+    invalidate(table, keys)
+
+
+class ChangeListener(threading.Thread):
+    """Écoute les changements publiés par les autres processus et invalide le cache."""
+
+    def __init__(self, connect):
+        super().__init__(name='cache-listener', daemon=True)
+        self.connect = connect
+
+    def _handle(self, payload):
+        try:
+            change = json.loads(payload)
+            invalidate(change['table'], change.get('keys'))
+        except (ValueError, KeyError) as e:
+            print(f"Notification de cache invalide ignorée: {str(e)}")
+
+    def run(self):
+        while True:
+            conn = None
+            try:
+                conn = self.connect()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                # Des notifications ont pu être perdues pendant la déconnexion
+                clear()
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn.notifies.pop(0).payload)
+            except psycopg2.Error as e:
+                print(f"Erreur de l'écoute des changements: {str(e)}")
+                time.sleep(5)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+
+def start_listener(connect):
+    """Démarre, une seule fois par processus, l'écoute des changements."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = ChangeListener(connect)
+            _listener.start()
@@ -1,28 +1,472 @@
+import atexit
 import os
+import threading
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import psycopg2.errors
+from psycopg2.extras import RealDictCursor, execute_values
 import pandas as pd
 import hashlib
 import json
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date as Date, datetime, timedelta, timezone
+
+import cache
+
+# Types compacts pour le mode « typed » des lectures de transactions :
+# montant en centimes exacts (int64), dimensions textuelles en 'category'.
+TYPED_TRANSACTION_COLUMNS = """
+    t.id, t.date, ROUND(t.montant * 100)::BIGINT AS montant, t.libelle,
+    t.category_id, t.type, t.project, t.payer, t.created_at,
+    c.name AS category_name
+"""
+TYPED_TRANSACTION_DTYPES = {
+    'id': 'int64',
+    'montant': 'int64',
+    'category_id': 'Int64',
+    'category_name': 'category',
+    'type': 'category',
+    'project': 'category',
+    'payer': 'boolean',
+}
+
+# Empreinte du contenu d'une transaction importée (date, montant en centimes,
+# libellé normalisé, type, catégorie) : clé naturelle pour dédoublonner
+FINGERPRINT_SQL = r"""md5(concat_ws('|',
+    {p}date,
+    ROUND({p}montant * 100)::BIGINT,
+    lower(regexp_replace(btrim({p}libelle), '\s+', ' ', 'g')),
+    {p}type,
+    COALESCE({p}category_id::TEXT, '')
+))"""
+
+# Registre des requêtes fréquentes préparées côté serveur (PREPARE), une
+# fois par connexion, puis exécutées via EXECUTE : nom -> (types, requête)
+PREPARED_STATEMENTS = {
+    'category_exists': (
+        "(integer)",
+        "SELECT id FROM categories WHERE id = $1"
+    ),
+    # Une saisie reçoit l'empreinte de son contenu, pour qu'un import qui la
+    # recouvre la reconnaisse ; identique à une ligne existante, elle est
+    # conservée sans empreinte (comme lors du remplissage des empreintes)
+    'insert_transaction': (
+        "(date, numeric, text, integer, text, text, boolean)",
+        f"""WITH input AS (
+               SELECT $1 AS date, $2 AS montant, $3 AS libelle, $4 AS category_id,
+                      $5 AS type, $6 AS project, $7 AS payer
+           ), fingerprinted AS (
+               SELECT input.*, {FINGERPRINT_SQL.format(p='input.')} AS fingerprint FROM input
+           )
+           INSERT INTO transactions (date, montant, libelle, category_id, type, project, payer, fingerprint)
+           SELECT date, montant, libelle, category_id, type, project, payer,
+                  CASE WHEN EXISTS (SELECT 1 FROM transactions t
+                                    WHERE t.fingerprint = f.fingerprint AND t.date = f.date)
+                         OR EXISTS (SELECT 1 FROM transactions_archive a WHERE a.fingerprint = f.fingerprint)
+                       THEN NULL ELSE f.fingerprint END
+           FROM fingerprinted f
+           RETURNING id"""
+    ),
+    'verify_login': (
+        "(text, text)",
+        """SELECT id, username, role, full_name, email
+           FROM users
+           WHERE username = $1 AND password = $2"""
+    ),
+}
+
+PERIOD_FORMATS = {
+    'day': 'YYYY-MM-DD',
+    'month': 'YYYY-MM',
+    'year': 'YYYY'
+}
+
+# Partitionnement de `transactions` par plage de dates : 'month' ou 'year'
+PARTITION_INTERVAL = os.environ.get('PARTITION_INTERVAL', 'month')
+# Nombre de partitions futures créées à l'avance, en plus de la période en cours
+PARTITIONS_AHEAD = 3
+
+TRANSACTION_COLUMNS = "id, date, montant, libelle, category_id, type, project, payer, created_at, fingerprint"
+
+# Source des rapports : détail vivant et agrégats des périodes archivées
+REPORTING_SOURCE = """(
+    SELECT date, category_id, project, type, payer, montant FROM transactions
+    UNION ALL
+    SELECT date, category_id, project, type, payer, montant FROM transaction_rollups
+)"""
+
+# Nombre de mois après lesquels une période entièrement payée est archivée
+ARCHIVE_AFTER_MONTHS = int(os.environ.get('ARCHIVE_AFTER_MONTHS', 12))
+
+def _transactions_source(include_archive=False):
+    """Table des transactions, complétée au besoin par les transactions archivées."""
+    if not include_archive:
+        return "transactions"
+    return f"""(
+        SELECT {TRANSACTION_COLUMNS} FROM transactions
+        UNION ALL
+        SELECT {TRANSACTION_COLUMNS} FROM transactions_archive
+    )"""
+
+def _transactions_ddl(name):
+    """DDL de la table `transactions` partitionnée par plage de dates."""
+    return f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id SERIAL,
+            date DATE NOT NULL,
+            montant DECIMAL(15,2) NOT NULL,
+            libelle TEXT NOT NULL,
+            category_id INTEGER REFERENCES categories(id),
+            type TEXT CHECK (type IN ('charge', 'recette')) NOT NULL,
+            project TEXT,
+            payer BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            fingerprint TEXT,
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """
+
+def _partition_bounds(day, interval=PARTITION_INTERVAL):
+    """Nom et bornes [début, fin) de la partition contenant `day`."""
+    if interval == 'year':
+        return f"transactions_{day.year}", Date(day.year, 1, 1), Date(day.year + 1, 1, 1)
+    start = Date(day.year, day.month, 1)
+    end = Date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+    return f"transactions_{day.year}_{day.month:02d}", start, end
+
+# Durées maximales des requêtes par classe (millisecondes) : lectures
+# interactives (défaut de chaque connexion), rapports et traitements de masse
+STATEMENT_TIMEOUTS = {
+    'interactive': int(os.environ.get('STATEMENT_TIMEOUT_INTERACTIVE_MS', 10000)),
+    'report': int(os.environ.get('STATEMENT_TIMEOUT_REPORT_MS', 60000)),
+    'bulk': int(os.environ.get('STATEMENT_TIMEOUT_BULK_MS', 1800000)),
+}
+# Granularité de repli d'un rapport qui dépasse sa durée maximale
+COARSER_PERIODS = {'day': 'month', 'month': 'year'}
+
+def _session_options():
+    """Options de session appliquées à chaque nouvelle connexion."""
+    return f"-c statement_timeout={STATEMENT_TIMEOUTS['interactive']}"
+
+def _query_canceled(error):
+    """Renvoie l'erreur QueryCanceled à l'origine de `error` (pandas l'enveloppe), sinon None."""
+    while error is not None:
+        if isinstance(error, psycopg2.errors.QueryCanceled):
+            return error
+        error = error.__cause__
+    return None
+
+def connection_params():
+    """Paramètres de connexion à la base principale, lus dans l'environnement."""
+    return dict(
+        dbname=os.environ['PGDATABASE'],
+        user=os.environ['PGUSER'],
+        password=os.environ['PGPASSWORD'],
+        host=os.environ['PGHOST'],
+        port=os.environ['PGPORT'],
+        options=_session_options()
+    )
+
+def replica_dsns():
+    """DSN des réplicas en lecture (variable PGREPLICAS, séparés par des virgules)."""
+    return [dsn.strip() for dsn in os.environ.get('PGREPLICAS', '').split(',') if dsn.strip()]
+
+# Après un changement, les lectures restent sur la base principale pendant ce
+# délai (secondes) pour ne pas lire un réplica en retard sur ses propres écritures
+READ_YOUR_WRITES_WINDOW = float(os.environ.get('READ_YOUR_WRITES_WINDOW', 5))
+# Durée (secondes) pendant laquelle un réplica en échec est écarté
+REPLICA_RETRY_DELAY = 30
+# Retard de rejeu maximal (secondes) d'un réplica utilisé ; il doit rester sous
+# READ_YOUR_WRITES_WINDOW pour qu'un réplica lu après ce délai ait rejoué le
+# changement (sinon ses lectures, mises en cache, seraient périmées)
+REPLICA_MAX_LAG = min(float(os.environ.get('REPLICA_MAX_LAG', 1)), READ_YOUR_WRITES_WINDOW / 2)
+
+def _date_conditions(start_date=None, end_date=None, column='t.date'):
+    """Conditions SQL de période (bornes incluses) et leurs paramètres.
+
+    Filtrer sur `date` permet l'élagage des partitions de `transactions`.
+    """
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f"{column} >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{column} <= %s")
+        params.append(end_date)
+    return conditions, params
+
+def _where(conditions):
+    """Assemble une clause WHERE (vide s'il n'y a aucune condition)."""
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+def _filtered_transactions_deps(category_id=None, start_date=None, end_date=None, typed=False,
+                                include_archive=True):
+    """Dépendances de cache de `get_filtered_transactions` (même signature)."""
+    if category_id:
+        return {('categories', None), ('transactions', f"category:{category_id}")}
+    return {('categories', None), ('transactions', None)}
+
+# Intervalle (secondes) d'écriture groupée des dates de dernière connexion
+LAST_LOGIN_FLUSH_INTERVAL = float(os.environ.get('LAST_LOGIN_FLUSH_INTERVAL', 5))
+
+class LastLoginBuffer:
+    """Tampon des dates de dernière connexion, hors du chemin critique du login.
+
+    Les connexions réussies sont notées en mémoire puis écrites en une seule
+    requête toutes les `interval` secondes, et à l'arrêt du processus.
+    """
+
+    def __init__(self, interval=LAST_LOGIN_FLUSH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._conn = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def record(self, user_id):
+        """Note la connexion d'un utilisateur, écrite au prochain vidage."""
+        # Instant absolu : converti dans le fuseau de la base à l'écriture,
+        # comme l'était CURRENT_TIMESTAMP
+        with self._lock:
+            self._pending[user_id] = datetime.now(timezone.utc)
+
+    def flush(self):
+        """Écrit en une requête les dates de connexion en attente.
+
+        Les vidages sont sérialisés : celui de l'arrêt du processus peut
+        croiser celui du thread périodique, qui partagent la connexion.
+        """
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            if self._conn is None or self._conn.closed:
+                self._conn = psycopg2.connect(**connection_params())
+                self._conn.autocommit = True
+            with self._conn.cursor() as cur:
+                execute_values(cur, """
+                    UPDATE users SET last_login = v.last_login
+                    FROM (VALUES %s) AS v(id, last_login)
+                    WHERE users.id = v.id
+                """, list(pending.items()), template="(%s::integer, %s::timestamptz)")
+                cache.publish(cur, 'users', sorted(pending))
+        except psycopg2.Error as e:
+            print(f"Erreur lors de l'enregistrement des dernières connexions: {str(e)}")
+            # Remet en attente sans écraser une connexion plus récente
+            with self._lock:
+                for user_id, last_login in pending.items():
+                    self._pending.setdefault(user_id, last_login)
+            if self._conn is not None and not self._conn.closed:
+                self._conn.close()
+            self._conn = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def stop(self):
+        """Arrête le vidage périodique après un dernier vidage."""
+        self._stopped.set()
+        self.flush()
+
+_last_login_buffer = None
+_last_login_lock = threading.Lock()
+
+def last_login_buffer():
+    """Tampon des dernières connexions du processus, démarré au premier usage."""
+    global _last_login_buffer
+    with _last_login_lock:
+        if _last_login_buffer is None:
+            _last_login_buffer = LastLoginBuffer()
+            _last_login_buffer.start()
+        return _last_login_buffer
+
+# Colonnes de `partner_payments` ajoutées à une table antérieure, et index
+PARTNER_PAYMENT_COLUMNS = [
+    ('project_id', 'INTEGER REFERENCES projects(id)'),
+    ('partner', 'TEXT'),
+    ('date', 'DATE'),
+    ('montant', 'DECIMAL(15,2)'),
+    ('description', 'TEXT'),
+    ('created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+]
+PARTNER_PAYMENT_INDEXES = [
+    "CREATE INDEX {concurrently}IF NOT EXISTS idx_partner_payments_partner ON partner_payments (partner, date)",
+    "CREATE INDEX {concurrently}IF NOT EXISTS idx_partner_payments_project ON partner_payments (project_id, date)",
+]
+
+# Indicateurs de la page d'accueil : délai maximal entre deux calculs et
+# fréquence de détection des changements (secondes)
+KPI_REFRESH_INTERVAL = float(os.environ.get('KPI_REFRESH_INTERVAL', 300))
+KPI_CHANGE_POLL = float(os.environ.get('KPI_CHANGE_POLL', 2))
+
+# Tables dont un changement rend les indicateurs périmés
+KPI_SOURCES = ('transactions', 'transaction_rollups')
+
+# Calcul des indicateurs en un seul parcours des transactions et des agrégats
+KPI_REFRESH_SQL = f"""
+    WITH by_project AS (
+        SELECT project,
+               SUM(CASE WHEN type = 'charge' THEN montant ELSE 0 END) as charges,
+               SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END) as recettes,
+               SUM(CASE WHEN type = 'charge' AND NOT COALESCE(payer, FALSE) THEN montant ELSE 0 END) as unpaid_charges,
+               SUM(CASE WHEN type = 'recette' AND NOT COALESCE(payer, FALSE) THEN montant ELSE 0 END) as unpaid_recettes
+        FROM {REPORTING_SOURCE} t
+        GROUP BY project
+    )
+    INSERT INTO kpi_snapshot (id, total_charges, total_recettes, unpaid_charges, unpaid_recettes,
+                              project_balances, refreshed_at)
+    SELECT 1,
+           COALESCE(SUM(charges), 0),
+           COALESCE(SUM(recettes), 0),
+           COALESCE(SUM(unpaid_charges), 0),
+           COALESCE(SUM(unpaid_recettes), 0),
+           COALESCE(jsonb_object_agg(project, recettes - charges) FILTER (WHERE project IS NOT NULL), '{{}}'::jsonb),
+           CURRENT_TIMESTAMP
+    FROM by_project
+    ON CONFLICT (id) DO UPDATE SET
+        total_charges = EXCLUDED.total_charges,
+        total_recettes = EXCLUDED.total_recettes,
+        unpaid_charges = EXCLUDED.unpaid_charges,
+        unpaid_recettes = EXCLUDED.unpaid_recettes,
+        project_balances = EXCLUDED.project_balances,
+        refreshed_at = EXCLUDED.refreshed_at
+"""
+
+def _refresh_kpis(cur):
+    """Recalcule la ligne unique de `kpi_snapshot` et publie le changement."""
+    cur.execute(KPI_REFRESH_SQL)
+    cache.publish(cur, 'kpi_snapshot', [1])
+
+class KpiRefresher:
+    """Tient à jour les indicateurs précalculés de la page d'accueil.
+
+    Un seul processus calcule à la fois : celui qui détient le verrou
+    consultatif `kpi_snapshot` sur sa connexion dédiée (les autres retentent
+    de le prendre, au cas où ce processus s'arrêterait). Le calcul est relancé
+    après un changement des transactions, observé via le cache (y compris
+    ceux des autres processus), et au moins toutes les `interval` secondes.
+    Deux calculs sont espacés d'au moins la durée du précédent ; après un
+    échec, le délai avant nouvel essai double jusqu'à `interval`.
+    """
+
+    def __init__(self, interval=KPI_REFRESH_INTERVAL, poll=KPI_CHANGE_POLL):
+        self.interval = interval
+        self.poll = poll
+        self._conn = None
+        self._leader = False
+        self._refreshed = None
+        self._next_refresh = 0.0
+        self._backoff = poll
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='kpi-refresh', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stale(self):
+        """Indique si les indicateurs doivent être recalculés."""
+        return (self._refreshed is None
+                or cache.last_change(*KPI_SOURCES) >= self._refreshed
+                or time.monotonic() - self._refreshed >= self.interval)
+
+    def _close(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
+        self._leader = False
+
+    def _acquire(self):
+        """Prend, si possible, le rôle de processus de calcul."""
+        if self._conn is None or self._conn.closed:
+            # Agrégation complète : durée maximale des rapports
+            self._conn = psycopg2.connect(**{
+                **connection_params(),
+                'options': f"-c statement_timeout={STATEMENT_TIMEOUTS['report']}",
+            })
+            self._conn.autocommit = True
+            self._leader = False
+        if not self._leader:
+            with self._conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(hashtext('kpi_snapshot'))")
+                self._leader = cur.fetchone()[0]
+        return self._leader
+
+    def refresh(self):
+        """Recalcule les indicateurs si ce processus est celui du calcul."""
+        started = time.monotonic()
+        try:
+            if not self._acquire():
+                return
+            with self._conn.cursor() as cur:
+                _refresh_kpis(cur)
+            finished = time.monotonic()
+            self._refreshed = started
+            self._backoff = self.poll
+            self._next_refresh = finished + (finished - started)
+        except psycopg2.Error as e:
+            print(f"Erreur lors du calcul des indicateurs (nouvel essai dans {self._backoff:.0f}s): {str(e)}")
+            self._close()
+            self._next_refresh = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, self.interval)
+
+    def _run(self):
+        while True:
+            if time.monotonic() >= self._next_refresh and self.stale():
+                self.refresh()
+            if self._stopped.wait(self.poll):
+                return
+
+    def stop(self):
+        """Arrête les recalculs ; le verrou est libéré avec la connexion."""
+        self._stopped.set()
+
+_kpi_refresher = None
+_kpi_refresher_lock = threading.Lock()
+
+def kpi_refresher():
+    """Recalcul des indicateurs du processus, démarré au premier usage."""
+    global _kpi_refresher
+    with _kpi_refresher_lock:
+        if _kpi_refresher is None:
+            _kpi_refresher = KpiRefresher()
+            _kpi_refresher.start()
+        return _kpi_refresher
 
 class Database:
     def __init__(self):
         self.conn = None
+        self._prepared = set()
+        self._tx_depth = 0
+        self._running_conn = None
+        self._cancel_requested = False
+        self.replicas = [{'dsn': dsn, 'conn': None, 'down_until': 0.0} for dsn in replica_dsns()]
+        self._replica_index = 0
         self.connect()
         self._create_tables()
+        cache.start_listener(lambda: psycopg2.connect(**connection_params()))
 
     def connect(self):
         """Établit une nouvelle connexion à la base de données."""
         try:
             if self.conn is None or self.conn.closed:
-                self.conn = psycopg2.connect(
-                    dbname=os.environ['PGDATABASE'],
-                    user=os.environ['PGUSER'],
-                    password=os.environ['PGPASSWORD'],
-                    host=os.environ['PGHOST'],
-                    port=os.environ['PGPORT']
-                )
+                self.conn = psycopg2.connect(**connection_params())
                 self.conn.autocommit = True
+                # Les requêtes préparées sont propres à chaque connexion
+                self._prepared = set()
                 print("Connexion à la base de données établie avec succès")
         except Exception as e:
             print(f"Erreur de connexion à la base de données: {str(e)}")
@@ -30,6 +474,10 @@ class Database:
 
     def ensure_connection(self):
         """Assure que la connexion est active."""
+        # Dans une unité de travail, une reconnexion perdrait la transaction :
+        # une erreur de connexion doit alors remonter telle quelle
+        if self._tx_depth:
+            return
         try:
             if self.conn is None or self.conn.closed:
                 self.connect()
@@ -40,6 +488,165 @@ class Database:
             print(f"Erreur de connexion détectée: {str(e)}")
             self.connect()
 
+    @contextmanager
+    def transaction(self):
+        """Regroupe plusieurs opérations dans une seule transaction.
+
+        Utilisation : `with db.transaction(): ...`. Tout est validé en un seul
+        COMMIT à la sortie du bloc, ou annulé en cas d'exception. Les blocs
+        imbriqués utilisent des points de sauvegarde (SAVEPOINT).
+        """
+        self.ensure_connection()
+        depth = self._tx_depth
+        savepoint = f"unit_of_work_{depth}"
+        with self.conn.cursor() as cur:
+            cur.execute("BEGIN" if depth == 0 else f"SAVEPOINT {savepoint}")
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            # Y compris KeyboardInterrupt et l'arrêt d'une exécution Streamlit :
+            # sans annulation, la transaction resterait ouverte
+            self._tx_depth = depth
+            with self.conn.cursor() as cur:
+                cur.execute("ROLLBACK" if depth == 0 else f"ROLLBACK TO SAVEPOINT {savepoint}")
+            raise
+        else:
+            self._tx_depth = depth
+            with self.conn.cursor() as cur:
+                cur.execute("COMMIT" if depth == 0 else f"RELEASE SAVEPOINT {savepoint}")
+
+    @contextmanager
+    def _statement_timeout(self, conn, kind):
+        """Borne la durée des requêtes du bloc selon leur classe.
+
+        Classes : 'interactive' (défaut des connexions), 'report' et 'bulk'.
+        Dans une unité de travail, la durée vaut jusqu'à la fin de la transaction.
+        """
+        in_transaction = bool(self._tx_depth) and conn is self.conn
+        with conn.cursor() as cur:
+            cur.execute(f"SET {'LOCAL ' if in_transaction else ''}statement_timeout = %s",
+                        (STATEMENT_TIMEOUTS[kind],))
+        previous, self._running_conn = self._running_conn, conn
+        try:
+            yield
+        finally:
+            self._running_conn = previous
+            if not in_transaction and not conn.closed:
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("SET statement_timeout = %s", (STATEMENT_TIMEOUTS['interactive'],))
+                except psycopg2.Error:
+                    pass
+
+    def cancel_report(self):
+        """Annule la requête longue en cours (appelable depuis un autre thread)."""
+        self._cancel_requested = True
+        conn = self._running_conn
+        if conn is not None and not conn.closed:
+            conn.cancel()
+            print("Annulation de la requête en cours demandée")
+
+    def _read_report(self, build_query, period='month', start_date=None, end_date=None):
+        """Exécute un rapport borné par la durée maximale des rapports.
+
+        Un rapport qui dépasse ce délai est relancé à une granularité plus
+        grossière (jour, puis mois, puis année) ; le résultat porte alors la
+        granularité obtenue dans `df.attrs['degraded']`. Une annulation
+        demandée par l'utilisateur ou un échec à l'année lève QueryCanceled.
+        """
+        conn = self._read_conn()
+        self._cancel_requested = False
+        requested = period
+        while True:
+            query, params = build_query(period, start_date, end_date)
+            try:
+                with self._statement_timeout(conn, 'report'):
+                    df = pd.read_sql(query, conn, params=params or None)
+            except Exception as e:
+                canceled = _query_canceled(e)
+                if canceled is None:
+                    raise
+                if self._cancel_requested or period not in COARSER_PERIODS:
+                    raise canceled
+                print(f"Rapport trop long à la granularité '{period}', "
+                      f"nouvel essai à la granularité '{COARSER_PERIODS[period]}'")
+                period = COARSER_PERIODS[period]
+                continue
+            if period != requested:
+                df.attrs['degraded'] = period
+            return df
+
+    def _replica_connection(self, replica):
+        """Renvoie la connexion d'un réplica s'il est sain, sinon None.
+
+        Un réplica injoignable ou dont le retard de rejeu dépasse
+        REPLICA_MAX_LAG est écarté pendant REPLICA_RETRY_DELAY secondes.
+        """
+        if replica['down_until'] > time.monotonic():
+            return None
+        try:
+            if replica['conn'] is None or replica['conn'].closed:
+                replica['conn'] = psycopg2.connect(replica['dsn'], options=_session_options())
+                replica['conn'].autocommit = True
+            with replica['conn'].cursor() as cur:
+                # Retard nul si tout le WAL reçu est rejoué, sinon ancienneté
+                # de la dernière transaction rejouée
+                cur.execute("""
+                    SELECT CASE
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                    END
+                """)
+                lag = cur.fetchone()[0]
+            if lag > REPLICA_MAX_LAG:
+                print(f"Réplica en retard de {lag:.1f}s, bascule sur la base principale")
+                replica['down_until'] = time.monotonic() + REPLICA_RETRY_DELAY
+                return None
+            return replica['conn']
+        except psycopg2.Error as e:
+            print(f"Réplica indisponible, bascule sur la base principale: {str(e)}")
+            if replica['conn'] is not None and not replica['conn'].closed:
+                replica['conn'].close()
+            replica['conn'] = None
+            replica['down_until'] = time.monotonic() + REPLICA_RETRY_DELAY
+            return None
+
+    def _read_conn(self):
+        """Choisit la connexion d'une lecture.
+
+        Les réplicas sains sont utilisés à tour de rôle ; la base principale
+        sert de repli, et reste utilisée juste après un changement ainsi que
+        dans une unité de travail.
+        """
+        if (self.replicas and not self._tx_depth
+                and time.monotonic() - cache.last_change() >= READ_YOUR_WRITES_WINDOW):
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self._replica_index % len(self.replicas)]
+                self._replica_index += 1
+                conn = self._replica_connection(replica)
+                if conn is not None:
+                    return conn
+        self.ensure_connection()
+        return self.conn
+
+    def _prepare(self, cur, name):
+        """Prépare une requête du registre sur la connexion courante si besoin."""
+        if name in self._prepared:
+            return
+        types, sql = PREPARED_STATEMENTS[name]
+        try:
+            cur.execute(f"PREPARE {name} {types} AS {sql}")
+        except psycopg2.errors.DuplicatePreparedStatement:
+            pass
+        self._prepared.add(name)
+
+    def _execute_prepared(self, cur, name, params):
+        """Exécute une requête préparée du registre avec EXECUTE."""
+        self._prepare(cur, name)
+        placeholders = ', '.join(['%s'] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+
     def _create_tables(self):
         """Crée les tables si elles n'existent pas."""
         self.ensure_connection()
@@ -79,19 +686,112 @@ class Database:
                     )
                 """)
 
+                # Table partitionnée par date ; une table existante non
+                # partitionnée est conservée (voir migrate_partitions.py)
+                # Les DDL de mise à niveau verrouillent la table même quand il n'y
+                # a rien à faire : elles relèvent de migrate_fingerprints.py
+                cur.execute("SELECT to_regclass('transactions') IS NULL, to_regclass('transactions_archive') IS NULL")
+                new_transactions, new_archive = cur.fetchone()
+                cur.execute(_transactions_ddl('transactions'))
+                if new_transactions:
+                    cur.execute("""
+                        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_fingerprint
+                        ON transactions (fingerprint, date)
+                    """)
+                if self._is_partitioned(cur, 'transactions'):
+                    cur.execute("CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT")
+                    today = Date.today()
+                    self._create_partitions(cur, 'transactions', today, self._partitions_horizon(today))
+
+                # Archive des périodes closes et agrégats conservés pour les rapports
                 cur.execute("""
-                    CREATE TABLE IF NOT EXISTS transactions (
-                        id SERIAL PRIMARY KEY,
+                    CREATE TABLE IF NOT EXISTS transactions_archive (
+                        id INTEGER PRIMARY KEY,
                         date DATE NOT NULL,
                         montant DECIMAL(15,2) NOT NULL,
                         libelle TEXT NOT NULL,
                         category_id INTEGER REFERENCES categories(id),
-                        type TEXT CHECK (type IN ('charge', 'recette')) NOT NULL,
+                        type TEXT NOT NULL,
                         project TEXT,
-                        payer BOOLEAN DEFAULT FALSE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        payer BOOLEAN,
+                        created_at TIMESTAMP,
+                        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        fingerprint TEXT
+                    )
+                """)
+                if new_archive:
+                    cur.execute("""
+                        CREATE INDEX IF NOT EXISTS idx_transactions_archive_fingerprint
+                        ON transactions_archive (fingerprint)
+                    """)
+                # Les lectures sélectionnent `fingerprint` : sur une base antérieure,
+                # la colonne (nullable, sans défaut : simple changement de
+                # catalogue) est ajoutée une fois, seulement si elle manque
+                cur.execute("""
+                    SELECT t.table_name FROM unnest(ARRAY['transactions', 'transactions_archive']) AS t(table_name)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM information_schema.columns c
+                        WHERE c.table_schema = current_schema() AND c.table_name = t.table_name
+                          AND c.column_name = 'fingerprint'
                     )
                 """)
+                for (table,) in cur.fetchall():
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS fingerprint TEXT")
+                    print(f"Colonne 'fingerprint' ajoutée à '{table}'")
+                cur.execute("SELECT to_regclass('idx_transactions_fingerprint'), to_regclass('idx_transactions_archive_fingerprint')")
+                if None in cur.fetchone():
+                    print("Index des empreintes d'import absents : exécutez migrate_fingerprints.py")
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS transaction_rollups (
+                        date DATE NOT NULL,
+                        category_id INTEGER REFERENCES categories(id),
+                        project TEXT,
+                        type TEXT NOT NULL,
+                        payer BOOLEAN,
+                        montant DECIMAL(15,2) NOT NULL,
+                        row_count INTEGER NOT NULL
+                    )
+                """)
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_transaction_rollups_date ON transaction_rollups (date)")
+
+                # Indicateurs de la page d'accueil, précalculés (une seule ligne)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS kpi_snapshot (
+                        id SMALLINT PRIMARY KEY CHECK (id = 1),
+                        total_charges DECIMAL(15,2) NOT NULL,
+                        total_recettes DECIMAL(15,2) NOT NULL,
+                        unpaid_charges DECIMAL(15,2) NOT NULL,
+                        unpaid_recettes DECIMAL(15,2) NOT NULL,
+                        project_balances JSONB NOT NULL DEFAULT '{}'::jsonb,
+                        refreshed_at TIMESTAMP NOT NULL
+                    )
+                """)
+
+                # Paiements aux partenaires, rattachés aux projets ; une table
+                # antérieure est mise à niveau par migrate_partner_payments.py
+                cur.execute("SELECT to_regclass('partner_payments') IS NULL")
+                if cur.fetchone()[0]:
+                    cur.execute("""
+                        CREATE TABLE IF NOT EXISTS partner_payments (
+                            id SERIAL PRIMARY KEY,
+                            project_id INTEGER NOT NULL REFERENCES projects(id),
+                            partner TEXT NOT NULL,
+                            date DATE NOT NULL,
+                            montant DECIMAL(15,2) NOT NULL CHECK (montant > 0),
+                            description TEXT,
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    for statement in PARTNER_PAYMENT_INDEXES:
+                        cur.execute(statement.format(concurrently=''))
+                else:
+                    cur.execute("""
+                        SELECT COUNT(*) FROM information_schema.columns
+                        WHERE table_schema = current_schema() AND table_name = 'partner_payments'
+                          AND column_name = ANY(%s)
+                    """, ([column for column, _ in PARTNER_PAYMENT_COLUMNS],))
+                    if cur.fetchone()[0] < len(PARTNER_PAYMENT_COLUMNS):
+                        print("Table 'partner_payments' antérieure : exécutez migrate_partner_payments.py")
 
                 # Create todo_tasks table
                 cur.execute("""
@@ -131,11 +831,288 @@ class Database:
             print(f"Erreur lors de la création des tables: {str(e)}")
             raise
 
+    def _is_partitioned(self, cur, table):
+        """Indique si la table est partitionnée."""
+        cur.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_partitioned_table p
+                JOIN pg_class c ON c.oid = p.partrelid
+                WHERE c.oid = to_regclass(%s)
+            )
+        """, (table,))
+        return cur.fetchone()[0]
+
+    def _partitions_horizon(self, day):
+        """Date jusqu'à laquelle des partitions doivent exister à l'avance."""
+        end = day
+        # Période en cours, puis PARTITIONS_AHEAD périodes suivantes
+        for _ in range(PARTITIONS_AHEAD + 1):
+            end = _partition_bounds(end)[2]
+        return end
+
+    def _create_partition(self, cur, parent, name, start, end):
+        """Crée une partition de `parent` pour [start, end) si elle n'existe pas.
+
+        Les lignes déjà rangées dans la partition par défaut pour cette plage
+        y sont déplacées avant le rattachement. Les sessions qui démarrent en
+        même temps ne se concurrencent pas : une seule crée la partition, les
+        autres passent leur tour (la partition par défaut reçoit les lignes
+        en attendant).
+        """
+        cur.execute("SELECT to_regclass(%s)", (name,))
+        if cur.fetchone()[0]:
+            return
+        with self.transaction():
+            cur.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (name,))
+            if not cur.fetchone()[0]:
+                return
+            cur.execute("SELECT to_regclass(%s)", (name,))
+            if cur.fetchone()[0]:
+                return
+            cur.execute("SELECT to_regclass('transactions_default')")
+            has_default = cur.fetchone()[0] is not None
+            if has_default:
+                cur.execute("SELECT 1 FROM transactions_default WHERE date >= %s AND date < %s LIMIT 1", (start, end))
+                has_default = cur.fetchone() is not None
+            if not has_default:
+                cur.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} FOR VALUES FROM (%s) TO (%s)",
+                            (start, end))
+            else:
+                cur.execute(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+                cur.execute(f"""
+                    WITH moved AS (
+                        DELETE FROM transactions_default
+                        WHERE date >= %s AND date < %s
+                        RETURNING {TRANSACTION_COLUMNS}
+                    )
+                    INSERT INTO {name} ({TRANSACTION_COLUMNS}) SELECT {TRANSACTION_COLUMNS} FROM moved
+                """, (start, end))
+                cur.execute(f"ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", (start, end))
+        print(f"Partition '{name}' créée")
+
+    def _create_partitions(self, cur, parent, first_day, last_day):
+        """Crée les partitions couvrant la plage [first_day, last_day)."""
+        day = first_day
+        while day < last_day:
+            name, start, end = _partition_bounds(day)
+            self._create_partition(cur, parent, name, start, end)
+            day = end
+
+    def ensure_transaction_partitions(self):
+        """Crée les partitions des prochaines périodes (à lancer périodiquement)."""
+        self.ensure_connection()
+        try:
+            with self.conn.cursor() as cur:
+                if not self._is_partitioned(cur, 'transactions'):
+                    return
+                today = Date.today()
+                self._create_partitions(cur, 'transactions', today, self._partitions_horizon(today))
+        except Exception as e:
+            print(f"Erreur lors de la création des partitions: {str(e)}")
+            raise
+
+    def migrate_fingerprints(self, batch_size=10000):
+        """Ajoute les empreintes d'import à une base existante et les renseigne.
+
+        Les lignes antérieures reçoivent l'empreinte de leur contenu, par lots,
+        pour qu'un import qui les recouvre les reconnaisse comme doublons. Parmi
+        des lignes identiques, seule la première est marquée ; les autres
+        gardent une empreinte vide. Peut être relancée sans risque.
+        """
+        self.ensure_connection()
+        try:
+            with self._statement_timeout(self.conn, 'bulk'), self.conn.cursor() as cur:
+                for table in ('transactions', 'transactions_archive'):
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS fingerprint TEXT")
+                # Index créé avant le remplissage (les empreintes vides ne sont pas
+                # en conflit) ; CONCURRENTLY n'existe pas pour une table partitionnée
+                concurrently = '' if self._is_partitioned(cur, 'transactions') else 'CONCURRENTLY '
+                cur.execute(f"""
+                    CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS idx_transactions_fingerprint
+                    ON transactions (fingerprint, date)
+                """)
+                cur.execute("""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_archive_fingerprint
+                    ON transactions_archive (fingerprint)
+                """)
+
+                last_id, filled = 0, 0
+                while True:
+                    cur.execute(f"""
+                        WITH batch AS (
+                            SELECT id, date, {FINGERPRINT_SQL.format(p='')} AS fingerprint
+                            FROM transactions
+                            WHERE fingerprint IS NULL AND id > %s
+                            ORDER BY id LIMIT %s
+                        ), firsts AS (
+                            SELECT DISTINCT ON (fingerprint, date) id, date, fingerprint
+                            FROM batch b
+                            WHERE NOT EXISTS (
+                                SELECT 1 FROM transactions t
+                                WHERE t.fingerprint = b.fingerprint AND t.date = b.date
+                            )
+                            ORDER BY fingerprint, date, id
+                        ), updated AS (
+                            UPDATE transactions t SET fingerprint = f.fingerprint
+                            FROM firsts f
+                            WHERE t.id = f.id AND t.date = f.date
+                            RETURNING t.id
+                        )
+                        SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(*) FROM updated)
+                    """, (last_id, batch_size))
+                    max_id, count = cur.fetchone()
+                    if max_id is None:
+                        break
+                    last_id = max_id
+                    filled += count
+                    print(f"{filled} empreintes renseignées (jusqu'à l'ID {last_id})")
+
+                while True:
+                    cur.execute(f"""
+                        WITH batch AS (
+                            SELECT id FROM transactions_archive
+                            WHERE fingerprint IS NULL
+                            ORDER BY id LIMIT %s
+                        )
+                        UPDATE transactions_archive a SET fingerprint = {FINGERPRINT_SQL.format(p='a.')}
+                        FROM batch b
+                        WHERE a.id = b.id
+                    """, (batch_size,))
+                    if not cur.rowcount:
+                        break
+                    filled += cur.rowcount
+
+                if filled:
+                    cache.publish(cur, 'transactions')
+                print(f"Empreintes d'import à jour ({filled} lignes renseignées)")
+        except Exception as e:
+            print(f"Erreur lors de la migration des empreintes: {str(e)}")
+            raise
+
+    def _apply_logged_changes(self, cur, batch_size):
+        """Recopie vers `transactions_new` un lot d'IDs du journal des changements.
+
+        Chaque ID est supprimé de la nouvelle table puis recopié dans son état
+        actuel (absent s'il a été supprimé). Renvoie le nombre d'IDs traités.
+        """
+        with self.transaction():
+            cur.execute("""
+                DELETE FROM transactions_changes
+                WHERE id IN (SELECT id FROM transactions_changes ORDER BY id LIMIT %s)
+                RETURNING id
+            """, (batch_size,))
+            ids = [row[0] for row in cur.fetchall()]
+            if ids:
+                cur.execute("DELETE FROM transactions_new WHERE id = ANY(%s)", (ids,))
+                cur.execute(f"""
+                    INSERT INTO transactions_new ({TRANSACTION_COLUMNS})
+                    SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE id = ANY(%s)
+                """, (ids,))
+        return len(ids)
+
+    def migrate_transactions_to_partitions(self, batch_size=10000):
+        """Convertit en ligne la table `transactions` en table partitionnée.
+
+        Les lignes sont copiées par lots pendant que l'application continue de
+        fonctionner ; un trigger note les IDs modifiés entre-temps, recopiés
+        ensuite par lots. Seule la bascule finale, qui n'applique que les
+        derniers changements notés, bloque brièvement les écritures.
+        L'ancienne table est conservée sous le nom `transactions_legacy`.
+        """
+        self.ensure_connection()
+        try:
+            with self._statement_timeout(self.conn, 'bulk'), self.conn.cursor() as cur:
+                if self._is_partitioned(cur, 'transactions'):
+                    print("La table 'transactions' est déjà partitionnée")
+                    return
+
+                cur.execute(_transactions_ddl('transactions_new'))
+                cur.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_new_fingerprint
+                    ON transactions_new (fingerprint, date)
+                """)
+                cur.execute("CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions_new DEFAULT")
+                cur.execute("SELECT MIN(date), MAX(date) FROM transactions")
+                first_day, last_day = cur.fetchone()
+                today = Date.today()
+                self._create_partitions(cur, 'transactions_new', first_day or today,
+                                        self._partitions_horizon(max(last_day or today, today)))
+
+                # Journal des IDs modifiés pendant la migration, tenu à jour par
+                # un trigger posé avant la copie
+                cur.execute("CREATE TABLE IF NOT EXISTS transactions_changes (id INTEGER PRIMARY KEY)")
+                cur.execute("""
+                    CREATE OR REPLACE FUNCTION transactions_log_change() RETURNS trigger AS $$
+                    BEGIN
+                        IF TG_OP <> 'INSERT' THEN
+                            INSERT INTO transactions_changes VALUES (OLD.id) ON CONFLICT DO NOTHING;
+                        END IF;
+                        IF TG_OP <> 'DELETE' THEN
+                            INSERT INTO transactions_changes VALUES (NEW.id) ON CONFLICT DO NOTHING;
+                        END IF;
+                        RETURN NULL;
+                    END
+                    $$ LANGUAGE plpgsql
+                """)
+                cur.execute("DROP TRIGGER IF EXISTS transactions_log_change ON transactions")
+                cur.execute("""
+                    CREATE TRIGGER transactions_log_change
+                    AFTER INSERT OR UPDATE OR DELETE ON transactions
+                    FOR EACH ROW EXECUTE FUNCTION transactions_log_change()
+                """)
+
+                # Copie par lots, sans verrou long sur la table d'origine
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM transactions_new")
+                last_id = cur.fetchone()[0]
+                while True:
+                    cur.execute(f"""
+                        WITH batch AS (
+                            SELECT {TRANSACTION_COLUMNS} FROM transactions
+                            WHERE id > %s ORDER BY id LIMIT %s
+                        ), copied AS (
+                            INSERT INTO transactions_new ({TRANSACTION_COLUMNS})
+                            SELECT {TRANSACTION_COLUMNS} FROM batch
+                        )
+                        SELECT MAX(id), COUNT(*) FROM batch
+                    """, (last_id, batch_size))
+                    max_id, count = cur.fetchone()
+                    if not count:
+                        break
+                    last_id = max_id
+                    print(f"{count} transactions copiées (jusqu'à l'ID {last_id})")
+
+                # Rattrapage des changements notés, par lots, sans verrou
+                while self._apply_logged_changes(cur, batch_size) >= batch_size:
+                    pass
+
+                # Bascule : seuls les changements notés depuis sont appliqués
+                with self.transaction():
+                    cur.execute("LOCK TABLE transactions IN EXCLUSIVE MODE")
+                    while self._apply_logged_changes(cur, batch_size):
+                        pass
+                    cur.execute("DROP TRIGGER transactions_log_change ON transactions")
+                    cur.execute("DROP FUNCTION transactions_log_change()")
+                    cur.execute("DROP TABLE transactions_changes")
+                    cur.execute("ALTER TABLE transactions RENAME TO transactions_legacy")
+                    cur.execute("ALTER TABLE transactions_new RENAME TO transactions")
+                    cur.execute("ALTER INDEX IF EXISTS idx_transactions_fingerprint RENAME TO idx_transactions_legacy_fingerprint")
+                    cur.execute("ALTER INDEX idx_transactions_new_fingerprint RENAME TO idx_transactions_fingerprint")
+                    cur.execute("""
+                        SELECT setval(pg_get_serial_sequence('transactions', 'id'), COALESCE(MAX(id), 0) + 1, false)
+                        FROM transactions
+                    """)
+                cache.publish(cur, 'transactions')
+                print("Migration de 'transactions' vers une table partitionnée terminée")
+        except Exception as e:
+            print(f"Erreur lors de la migration des transactions: {str(e)}")
+            raise
+
+    @cache.cached_read('users')
     def get_all_users(self):
         """Récupère tous les utilisateurs."""
-        self.ensure_connection()
+        conn = self._read_conn()
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute("""
                     SELECT id, username, role, full_name, email, created_at, last_login
                     FROM users
@@ -157,7 +1134,9 @@ class Database:
                     VALUES (%s, %s, %s, %s, %s)
                     RETURNING id
                 """, (username, hashed_password, role, full_name, email))
-                return cur.fetchone()[0]
+                user_id = cur.fetchone()[0]
+                cache.publish(cur, 'users', [user_id])
+                return user_id
         except Exception as e:
             print(f"Erreur lors de la création de l'utilisateur: {str(e)}")
             raise
@@ -180,6 +1159,7 @@ class Database:
                         SET full_name = %s, email = %s
                         WHERE id = %s
                     """, (full_name, email, user_id))
+                cache.publish(cur, 'users', [user_id])
         except Exception as e:
             print(f"Erreur lors de la mise à jour de l'utilisateur: {str(e)}")
             raise
@@ -190,6 +1170,7 @@ class Database:
         try:
             with self.conn.cursor() as cur:
                 cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+                cache.publish(cur, 'users', [user_id])
         except Exception as e:
             print(f"Erreur lors de la suppression de l'utilisateur: {str(e)}")
             raise
@@ -208,24 +1189,26 @@ class Database:
                     RETURNING id
                 """, (name, description))
                 category_id = cur.fetchone()[0]
+                cache.publish(cur, 'categories', [category_id])
                 print(f"Catégorie '{name}' créée avec succès (ID: {category_id})")
                 return category_id
         except psycopg2.Error as e:
             print(f"Erreur lors de l'ajout de la catégorie: {str(e)}")
             raise
 
+    @cache.cached_read('categories')
     def get_categories(self):
         """Récupère toutes les catégories."""
-        self.ensure_connection()
+        conn = self._read_conn()
         query = "SELECT * FROM categories ORDER BY name"
         try:
-            return pd.read_sql(query, self.conn)
+            return pd.read_sql(query, conn)
         except Exception as e:
             print(f"Erreur lors de la récupération des catégories: {str(e)}")
             return pd.DataFrame(columns=['id', 'name', 'description', 'created_at'])
 
-    def add_transaction(self, date, montant, libelle, category_id, type_, projet=None, payer=False):
-        """Ajoute une nouvelle transaction."""
+    def _validate_transaction(self, montant, libelle, category_id, type_):
+        """Vérifie les champs obligatoires d'une transaction."""
         if not isinstance(category_id, int):
             raise ValueError("L'ID de catégorie doit être un entier")
         if not libelle:
@@ -235,84 +1218,236 @@ class Database:
         if type_ not in ('charge', 'recette'):
             raise ValueError("Le type doit être 'charge' ou 'recette'")
 
+    def add_transaction(self, date, montant, libelle, category_id, type_, projet=None, payer=False):
+        """Ajoute une nouvelle transaction."""
+        self._validate_transaction(montant, libelle, category_id, type_)
+
         self.ensure_connection()
         try:
             with self.conn.cursor() as cur:
                 # Vérifie d'abord si la catégorie existe
-                cur.execute("SELECT id FROM categories WHERE id = %s", (category_id,))
+                self._execute_prepared(cur, 'category_exists', (category_id,))
                 if not cur.fetchone():
                     raise ValueError(f"La catégorie avec l'ID {category_id} n'existe pas")
 
-                # Ajoute la transaction
-                cur.execute("""
-                    INSERT INTO transactions (date, montant, libelle, category_id, type, project, payer)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (date, montant, libelle, category_id, type_, projet, payer))
+                # Ajoute la transaction ; si une ligne identique est insérée en
+                # même temps, la contrainte d'unicité des empreintes échoue et le
+                # nouvel essai la voit : la saisie est alors gardée sans empreinte
+                params = (date, montant, libelle, category_id, type_, projet, payer)
+                try:
+                    with self.transaction():
+                        self._execute_prepared(cur, 'insert_transaction', params)
+                except psycopg2.errors.UniqueViolation:
+                    self._execute_prepared(cur, 'insert_transaction', params)
                 transaction_id = cur.fetchone()[0]
+                cache.publish(cur, 'transactions', [f"category:{category_id}"])
                 print(f"Transaction créée avec succès (ID: {transaction_id})")
                 return transaction_id
         except Exception as e:
             print(f"Erreur lors de l'ajout de la transaction: {str(e)}")
             raise
 
-    def get_transactions(self):
-        """Récupère toutes les transactions avec leurs catégories."""
+    def ingest_transactions(self, rows, page_size=1000):
+        """Importe des transactions de façon idempotente.
+
+        Chaque ligne (dict avec date, montant, libelle, category_id, type et,
+        en option, project et payer) reçoit une empreinte de son contenu ;
+        les lignes déjà présentes, archivées ou répétées dans l'import sont
+        ignorées (ON CONFLICT DO NOTHING). Renvoie {'inserted': {index: id},
+        'skipped': [lignes ignorées, avec leur index et leur empreinte]}.
+        """
+        rows = list(rows)
+        for row in rows:
+            self._validate_transaction(row['montant'], row['libelle'], row['category_id'], row['type'])
+        if not rows:
+            return {'inserted': {}, 'skipped': []}
+
+        values = [
+            (index, row['date'], row['montant'], row['libelle'], row['category_id'], row['type'],
+             row.get('project'), row.get('payer', False))
+            for index, row in enumerate(rows)
+        ]
         self.ensure_connection()
-        query = """
-            SELECT t.*, c.name as category_name 
-            FROM transactions t 
+        try:
+            with self._statement_timeout(self.conn, 'bulk'), self.transaction(), self.conn.cursor() as cur:
+                results = execute_values(cur, f"""
+                    WITH input (idx, date, montant, libelle, category_id, type, project, payer) AS (
+                        VALUES %s
+                    ), fingerprinted AS (
+                        SELECT input.*, {FINGERPRINT_SQL.format(p='input.')} AS fingerprint FROM input
+                    ), inserted AS (
+                        INSERT INTO transactions (date, montant, libelle, category_id, type, project, payer, fingerprint)
+                        SELECT date, montant, libelle, category_id, type, project, payer, fingerprint
+                        FROM fingerprinted f
+                        WHERE NOT EXISTS (SELECT 1 FROM transactions_archive a WHERE a.fingerprint = f.fingerprint)
+                        ON CONFLICT DO NOTHING
+                        RETURNING id, fingerprint
+                    )
+                    SELECT f.idx, f.fingerprint, i.id
+                    FROM fingerprinted f
+                    LEFT JOIN inserted i ON i.fingerprint = f.fingerprint
+                    ORDER BY f.idx
+                """, values, template="(%s, %s::date, %s::numeric, %s, %s::integer, %s, %s, %s::boolean)",
+                    page_size=page_size, fetch=True)
+
+                inserted, skipped, seen = {}, [], set()
+                for index, fingerprint, transaction_id in results:
+                    # Une empreinte répétée dans l'import n'est insérée qu'une fois
+                    if transaction_id is not None and fingerprint not in seen:
+                        inserted[index] = transaction_id
+                    else:
+                        skipped.append(dict(rows[index], index=index, fingerprint=fingerprint))
+                    seen.add(fingerprint)
+                if inserted:
+                    keys = {f"category:{rows[index]['category_id']}" for index in inserted}
+                    cache.publish(cur, 'transactions', sorted(keys))
+                print(f"Import terminé: {len(inserted)} transactions ajoutées, {len(skipped)} doublons ignorés")
+                return {'inserted': inserted, 'skipped': skipped}
+        except Exception as e:
+            print(f"Erreur lors de l'import des transactions: {str(e)}")
+            raise
+
+    def _read_transactions(self, conn, query, params=None, typed=False):
+        """Exécute une lecture de transactions, en mode typé si demandé.
+
+        En mode typé, `montant` est renvoyé en centimes (int64), les
+        dimensions textuelles en dtype 'category' et les dates en datetime64.
+        Ces lectures pouvant couvrir tout l'historique, elles relèvent de la
+        durée maximale des rapports ; un dépassement lève QueryCanceled.
+        """
+        try:
+            with self._statement_timeout(conn, 'report'):
+                if not typed:
+                    return pd.read_sql(query.format(columns="t.*, c.name as category_name"), conn, params=params)
+                df = pd.read_sql(
+                    query.format(columns=TYPED_TRANSACTION_COLUMNS),
+                    conn,
+                    params=params,
+                    parse_dates=['date', 'created_at'],
+                )
+        except Exception as e:
+            canceled = _query_canceled(e)
+            if canceled is None:
+                raise
+            raise canceled
+        return df.astype(TYPED_TRANSACTION_DTYPES)
+
+    @cache.cached_read('transactions', 'categories', fallback_errors=(psycopg2.errors.QueryCanceled,))
+    def get_transactions(self, typed=False, include_archive=True):
+        """Récupère toutes les transactions avec leurs catégories.
+
+        Les transactions archivées sont incluses, sauf avec
+        `include_archive=False`. Une lecture trop longue renvoie le dernier
+        résultat connu ou lève QueryCanceled, plutôt qu'une liste vide.
+        """
+        conn = self._read_conn()
+        query = f"""
+            SELECT {{columns}}
+            FROM {_transactions_source(include_archive)} t 
             LEFT JOIN categories c ON t.category_id = c.id 
             ORDER BY t.created_at DESC, t.date DESC, t.id DESC
         """
         try:
-            return pd.read_sql(query, self.conn)
+            return self._read_transactions(conn, query, typed=typed)
+        except psycopg2.errors.QueryCanceled:
+            raise
         except Exception as e:
             print(f"Erreur lors de la récupération des transactions: {str(e)}")
             return pd.DataFrame(columns=['id', 'date', 'montant', 'libelle', 'category_name', 'type', 'project', 'payer'])
 
-    def get_filtered_transactions(self, category_id=None):
-        """Récupère les transactions filtrées par catégorie."""
-        self.ensure_connection()
-        query = """
-            SELECT t.*, c.name as category_name 
-            FROM transactions t 
+    @cache.cached_read(deps=_filtered_transactions_deps, fallback_errors=(psycopg2.errors.QueryCanceled,))
+    def get_filtered_transactions(self, category_id=None, start_date=None, end_date=None, typed=False,
+                                  include_archive=True):
+        """Récupère les transactions filtrées par catégorie et par période.
+
+        Comme `get_transactions`, une lecture trop longue n'est pas masquée.
+        """
+        conn = self._read_conn()
+        query = f"""
+            SELECT {{columns}}
+            FROM {_transactions_source(include_archive)} t 
             LEFT JOIN categories c ON t.category_id = c.id
         """
+        conditions, params = _date_conditions(start_date, end_date)
         if category_id:
-            query += " WHERE t.category_id = %s"
-        query += " ORDER BY t.date DESC"
+            conditions.append("t.category_id = %s")
+            params.append(category_id)
+        query += f" {_where(conditions)} ORDER BY t.date DESC"
 
         try:
-            params = (category_id,) if category_id else None
-            return pd.read_sql(query, self.conn, params=params)
+            params = params or None
+            return self._read_transactions(conn, query, params=params, typed=typed)
+        except psycopg2.errors.QueryCanceled:
+            raise
         except Exception as e:
             print(f"Erreur lors de la récupération des transactions filtrées: {str(e)}")
             return pd.DataFrame(columns=['date', 'montant', 'libelle', 'category_name', 'type', 'project', 'payer'])
 
-    def get_summary_by_period(self, period='month'):
-        """Récupère un résumé des transactions par période."""
-        self.ensure_connection()
-        period_format = {
-            'day': 'YYYY-MM-DD',
-            'month': 'YYYY-MM',
-            'year': 'YYYY'
-        }
-        query = f"""
+    def _transactions_export_query(self, start_date=None, end_date=None):
+        """Construit la requête d'export des transactions et ses paramètres.
+
+        L'export couvre tout l'historique, transactions archivées comprises.
+        """
+        conditions, params = _date_conditions(start_date, end_date)
+        return f"""
+            SELECT t.id, t.date, t.montant, t.libelle, c.name as category_name,
+                   t.type, t.project, t.payer
+            FROM {_transactions_source(include_archive=True)} t
+            LEFT JOIN categories c ON t.category_id = c.id
+            {_where(conditions)}
+            ORDER BY t.date DESC, t.id DESC
+        """, params
+
+    def count_query(self, query, params=None):
+        """Compte les lignes renvoyées par une requête."""
+        conn = self._read_conn()
+        with self._statement_timeout(conn, 'report'), conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM ({query}) AS q", params)
+            return cur.fetchone()[0]
+
+    def iter_query(self, query, params=None, batch_size=5000):
+        """Parcourt le résultat d'une requête par lots via un curseur serveur.
+
+        Produit des tuples (colonnes, lignes) sans jamais charger l'ensemble
+        du résultat en mémoire.
+        """
+        conn = self._read_conn()
+        # WITH HOLD permet l'usage d'un curseur serveur en mode autocommit
+        with self._statement_timeout(conn, 'bulk'), \
+                conn.cursor(name=f"iter_{uuid.uuid4().hex}", withhold=True) as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [col[0] for col in cur.description], rows
+
+    def _summary_by_period_query(self, period='month', start_date=None, end_date=None):
+        """Construit la requête du résumé par période et ses paramètres."""
+        conditions, params = _date_conditions(start_date, end_date)
+        return f"""
             SELECT 
-                TO_CHAR(date, '{period_format[period]}') as period,
+                TO_CHAR(date, '{PERIOD_FORMATS[period]}') as period,
                 c.name as category_name,
                 t.type,
                 t.payer,
                 SUM(CASE WHEN type = 'charge' THEN montant ELSE 0 END) as charges,
                 SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END) as recettes
-            FROM transactions t
+            FROM {REPORTING_SOURCE} t
             LEFT JOIN categories c ON t.category_id = c.id
+            {_where(conditions)}
             GROUP BY period, c.name, t.type, t.payer 
             ORDER BY period, c.name
-        """
+        """, params
+
+    @cache.cached_read('transactions', 'categories', fallback_errors=(psycopg2.errors.QueryCanceled,))
+    def get_summary_by_period(self, period='month', start_date=None, end_date=None):
+        """Récupère un résumé des transactions par période."""
         try:
-            return pd.read_sql(query, self.conn)
+            return self._read_report(self._summary_by_period_query, period, start_date, end_date)
+        except psycopg2.errors.QueryCanceled:
+            raise
         except Exception as e:
             print(f"Erreur lors de la récupération du résumé: {str(e)}")
             return pd.DataFrame(columns=['period', 'category_name', 'type', 'payer', 'charges', 'recettes'])
@@ -325,14 +1460,116 @@ class Database:
         self.ensure_connection()
         try:
             with self.conn.cursor() as cur:
-                cur.execute("DELETE FROM transactions WHERE id = %s RETURNING id", (transaction_id,))
-                if cur.fetchone() is None:
+                cur.execute("DELETE FROM transactions WHERE id = %s RETURNING category_id", (transaction_id,))
+                row = cur.fetchone()
+                if row is None:
                     raise ValueError(f"La transaction avec l'ID {transaction_id} n'existe pas")
+                cache.publish(cur, 'transactions', [f"category:{row[0]}"])
                 print(f"Transaction supprimée avec succès (ID: {transaction_id})")
         except Exception as e:
             print(f"Erreur lors de la suppression de la transaction: {str(e)}")
             raise
 
+    def _validate_ids(self, ids, message):
+        """Vérifie une liste d'IDs entiers et la renvoie sans doublons."""
+        ids = list(dict.fromkeys(ids))
+        if not all(isinstance(i, int) for i in ids):
+            raise ValueError(message)
+        return ids
+
+    def delete_transactions(self, transaction_ids):
+        """Supprime plusieurs transactions en une seule requête.
+
+        Renvoie {id: True si supprimée, False si introuvable}.
+        """
+        ids = self._validate_ids(transaction_ids, "Les IDs de transaction doivent être des entiers")
+        if not ids:
+            return {}
+
+        self.ensure_connection()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM transactions WHERE id = ANY(%s) RETURNING id, category_id", (ids,))
+                rows = cur.fetchall()
+                if rows:
+                    cache.publish(cur, 'transactions', sorted({f"category:{row[1]}" for row in rows}))
+                deleted = {row[0] for row in rows}
+                print(f"{len(deleted)} transactions supprimées avec succès")
+                return {i: i in deleted for i in ids}
+        except Exception as e:
+            print(f"Erreur lors de la suppression des transactions: {str(e)}")
+            raise
+
+    def set_paid(self, transaction_ids, value=True):
+        """Modifie le statut de paiement de plusieurs transactions en une seule requête.
+
+        Renvoie {id: True si mise à jour, False si introuvable}.
+        """
+        ids = self._validate_ids(transaction_ids, "Les IDs de transaction doivent être des entiers")
+        if not ids:
+            return {}
+
+        self.ensure_connection()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE transactions SET payer = %s
+                    WHERE id = ANY(%s)
+                    RETURNING id, category_id
+                """, (bool(value), ids))
+                rows = cur.fetchall()
+                if rows:
+                    cache.publish(cur, 'transactions', sorted({f"category:{row[1]}" for row in rows}))
+                updated = {row[0] for row in rows}
+                print(f"{len(updated)} transactions mises à jour avec succès")
+                return {i: i in updated for i in ids}
+        except Exception as e:
+            print(f"Erreur lors de la mise à jour des transactions: {str(e)}")
+            raise
+
+    def recategorize(self, transaction_ids, category_id):
+        """Réaffecte plusieurs transactions à une catégorie en une seule requête.
+
+        Renvoie {id: True si mise à jour, False si introuvable}.
+        """
+        ids = self._validate_ids(transaction_ids, "Les IDs de transaction doivent être des entiers")
+        if not isinstance(category_id, int):
+            raise ValueError("L'ID de catégorie doit être un entier")
+        if not ids:
+            return {}
+
+        self.ensure_connection()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    WITH category AS (
+                        SELECT id FROM categories WHERE id = %s
+                    ), previous AS (
+                        SELECT id, category_id FROM transactions WHERE id = ANY(%s) FOR UPDATE
+                    ), updated AS (
+                        UPDATE transactions t
+                        SET category_id = category.id
+                        FROM previous, category
+                        WHERE t.id = previous.id
+                        RETURNING t.id, previous.category_id
+                    )
+                    SELECT EXISTS (SELECT 1 FROM category),
+                           ARRAY(SELECT id FROM updated),
+                           ARRAY(SELECT DISTINCT category_id FROM updated)
+                """, (category_id, ids))
+                category_exists, updated_ids, previous_categories = cur.fetchone()
+                if not category_exists:
+                    raise ValueError(f"La catégorie avec l'ID {category_id} n'existe pas")
+                if updated_ids:
+                    keys = {f"category:{c}" for c in previous_categories} | {f"category:{category_id}"}
+                    cache.publish(cur, 'transactions', sorted(keys))
+                updated = set(updated_ids)
+                print(f"{len(updated)} transactions réaffectées à la catégorie {category_id}")
+                return {i: i in updated for i in ids}
+        except Exception as e:
+            print(f"Erreur lors de la réaffectation des transactions: {str(e)}")
+            raise
+
     def delete_category(self, category_id):
         """Supprime une catégorie si elle n'est pas utilisée."""
         if not isinstance(category_id, int):
@@ -340,9 +1577,18 @@ class Database:
 
         self.ensure_connection()
         try:
-            with self.conn.cursor() as cur:
+            with self.transaction(), self.conn.cursor() as cur:
+                # Verrouille la catégorie : aucune transaction ne peut la
+                # référencer entre la vérification et la suppression
+                cur.execute("SELECT id FROM categories WHERE id = %s FOR UPDATE", (category_id,))
+                if cur.fetchone() is None:
+                    raise ValueError(f"La catégorie avec l'ID {category_id} n'existe pas")
+
                 # Vérifie si la catégorie est utilisée
-                cur.execute("SELECT COUNT(*) FROM transactions WHERE category_id = %s", (category_id,))
+                cur.execute("""
+                    SELECT (SELECT COUNT(*) FROM transactions WHERE category_id = %s)
+                         + (SELECT COUNT(*) FROM transaction_rollups WHERE category_id = %s)
+                """, (category_id, category_id))
                 if cur.fetchone()[0] > 0:
                     raise ValueError("Cette catégorie ne peut pas être supprimée car elle est utilisée par des transactions")
 
@@ -350,6 +1596,7 @@ class Database:
                 cur.execute("DELETE FROM categories WHERE id = %s RETURNING id", (category_id,))
                 if cur.fetchone() is None:
                     raise ValueError(f"La catégorie avec l'ID {category_id} n'existe pas")
+                cache.publish(cur, 'categories', [category_id])
                 print(f"Catégorie supprimée avec succès (ID: {category_id})")
         except Exception as e:
             print(f"Erreur lors de la suppression de la catégorie: {str(e)}")
@@ -361,19 +1608,11 @@ class Database:
         try:
             hashed_password = hashlib.sha256(password.encode()).hexdigest()
             with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT id, username, role, full_name, email
-                    FROM users
-                    WHERE username = %s AND password = %s
-                """, (username, hashed_password))
+                self._execute_prepared(cur, 'verify_login', (username, hashed_password))
                 user = cur.fetchone()
                 if user:
-                    # Mettre à jour la date de dernière connexion
-                    cur.execute("""
-                        UPDATE users
-                        SET last_login = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                    """, (user['id'],))
+                    # Date de dernière connexion écrite en différé, par lots
+                    last_login_buffer().record(user['id'])
                 return user
         except Exception as e:
             print(f"Erreur lors de la vérification du login: {str(e)}")
@@ -393,18 +1632,20 @@ class Database:
                     RETURNING id
                 """, (name, description))
                 project_id = cur.fetchone()[0]
+                cache.publish(cur, 'projects', [project_id])
                 print(f"Projet '{name}' créé avec succès (ID: {project_id})")
                 return project_id
         except Exception as e:
             print(f"Erreur lors de l'ajout du projet: {str(e)}")
             raise
 
+    @cache.cached_read('projects')
     def get_projects(self):
         """Récupère tous les projets."""
-        self.ensure_connection()
+        conn = self._read_conn()
         query = "SELECT * FROM projects ORDER BY name"
         try:
-            return pd.read_sql(query, self.conn)
+            return pd.read_sql(query, conn)
         except Exception as e:
             print(f"Erreur lors de la récupération des projets: {str(e)}")
             return pd.DataFrame(columns=['id', 'name', 'description', 'created_at'])
@@ -416,68 +1657,85 @@ class Database:
 
         self.ensure_connection()
         try:
-            with self.conn.cursor() as cur:
+            with self.transaction(), self.conn.cursor() as cur:
+                cur.execute("SELECT name FROM projects WHERE id = %s FOR UPDATE", (project_id,))
+                project = cur.fetchone()
+                if project is None:
+                    raise ValueError(f"Le projet avec l'ID {project_id} n'existe pas")
+
                 # Vérifie si le projet est utilisé dans des transactions
-                cur.execute("SELECT COUNT(*) FROM transactions WHERE project = (SELECT name FROM projects WHERE id = %s)", (project_id,))
+                cur.execute("""
+                    SELECT (SELECT COUNT(*) FROM transactions WHERE project = %s)
+                         + (SELECT COUNT(*) FROM transaction_rollups WHERE project = %s)
+                """, (project[0], project[0]))
                 if cur.fetchone()[0] > 0:
                     raise ValueError("Ce projet ne peut pas être supprimé car il est utilisé par des transactions")
 
+                cur.execute("SELECT COUNT(*) FROM partner_payments WHERE project_id = %s", (project_id,))
+                if cur.fetchone()[0] > 0:
+                    raise ValueError("Ce projet ne peut pas être supprimé car il a des paiements partenaires")
+
                 # Supprime le projet
                 cur.execute("DELETE FROM projects WHERE id = %s RETURNING id", (project_id,))
                 if cur.fetchone() is None:
                     raise ValueError(f"Le projet avec l'ID {project_id} n'existe pas")
+                cache.publish(cur, 'projects', [project_id])
                 print(f"Projet supprimé avec succès (ID: {project_id})")
         except Exception as e:
             print(f"Erreur lors de la suppression du projet: {str(e)}")
             raise
-    def get_project_summary(self, period='month'):
-        """Récupère un résumé des transactions par projet."""
-        self.ensure_connection()
-        period_format = {
-            'day': 'YYYY-MM-DD',
-            'month': 'YYYY-MM',
-            'year': 'YYYY'
-        }
-        query = f"""
+
+    def _project_summary_query(self, period='month', start_date=None, end_date=None):
+        """Construit la requête du résumé par projet et ses paramètres."""
+        conditions, params = _date_conditions(start_date, end_date, column='date')
+        return f"""
             SELECT 
-                TO_CHAR(date, '{period_format[period]}') as period,
+                TO_CHAR(date, '{PERIOD_FORMATS[period]}') as period,
                 project,
                 SUM(CASE WHEN type = 'charge' THEN montant ELSE 0 END) as charges,
                 SUM(CASE WHEN type = 'recette' THEN montant ELSE 0 END) as recettes,
                 SUM(CASE WHEN type = 'recette' THEN montant ELSE -montant END) as balance
-            FROM transactions
-            WHERE project IS NOT NULL
+            FROM {REPORTING_SOURCE} t
+            {_where(['project IS NOT NULL'] + conditions)}
             GROUP BY period, project
             ORDER BY period DESC, project
-        """
+        """, params
+
+    @cache.cached_read('transactions', fallback_errors=(psycopg2.errors.QueryCanceled,))
+    def get_project_summary(self, period='month', start_date=None, end_date=None):
+        """Récupère un résumé des transactions par projet."""
         try:
-            return pd.read_sql(query, self.conn)
+            return self._read_report(self._project_summary_query, period, start_date, end_date)
+        except psycopg2.errors.QueryCanceled:
+            raise
         except Exception as e:
             print(f"Erreur lors de la récupération du résumé par projet: {str(e)}")
             return pd.DataFrame(columns=['period', 'project', 'charges', 'recettes', 'balance'])
 
-    def get_category_summary(self, period='month'):
-        """Récupère un résumé des transactions par catégorie."""
-        self.ensure_connection()
-        period_format = {
-            'day': 'YYYY-MM-DD',
-            'month': 'YYYY-MM',
-            'year': 'YYYY'
-        }
-        query = f"""
+    def _category_summary_query(self, period='month', start_date=None, end_date=None):
+        """Construit la requête du résumé par catégorie et ses paramètres."""
+        conditions, params = _date_conditions(start_date, end_date)
+        return f"""
             SELECT 
-                TO_CHAR(date, '{period_format[period]}') as period,
+                TO_CHAR(date, '{PERIOD_FORMATS[period]}') as period,
                 c.name as category_name,
                 SUM(CASE WHEN t.type = 'charge' THEN t.montant ELSE 0 END) as charges,
                 SUM(CASE WHEN t.type = 'recette' THEN t.montant ELSE 0 END) as recettes,
                 SUM(CASE WHEN t.type = 'recette' THEN t.montant ELSE -t.montant END) as balance
-            FROM transactions t
+            FROM {REPORTING_SOURCE} t
             LEFT JOIN categories c ON t.category_id = c.id
+            {_where(conditions)}
             GROUP BY period, c.name
             ORDER BY period DESC, c.name
-        """
+        """, params
+
+    @cache.cached_read('transactions', 'categories', fallback_errors=(psycopg2.errors.QueryCanceled,))
+    def get_category_summary(self, period='month', start_date=None, end_date=None):
+        """Récupère un résumé des transactions par catégorie."""
         try:
-            return pd.read_sql(query, self.conn)
+            return self._read_report(self._category_summary_query, period, start_date, end_date)
+        except psycopg2.errors.QueryCanceled:
+            raise
         except Exception as e:
             print(f"Erreur lors de la récupération du résumé par catégorie: {str(e)}")
             return pd.DataFrame(columns=['period', 'category_name', 'charges', 'recettes', 'balance'])
@@ -519,22 +1777,24 @@ class Database:
                     RETURNING id
                 """, (project_name, due_date, description, steps or '[]', requirements))
                 task_id = cur.fetchone()[0]
+                cache.publish(cur, 'todo_tasks', [task_id])
                 print(f"Tâche '{project_name}' créée avec succès (ID: {task_id})")
                 return task_id
         except Exception as e:
             print(f"Erreur lors de l'ajout de la tâche: {str(e)}")
             raise
 
+    @cache.cached_read('todo_tasks')
     def get_todo_tasks(self):
         """Récupère toutes les tâches todo."""
-        self.ensure_connection()
+        conn = self._read_conn()
         query = """
             SELECT id, project_name, due_date, description, steps, requirements, created_at
             FROM todo_tasks
             ORDER BY due_date ASC
         """
         try:
-            return pd.read_sql(query, self.conn)
+            return pd.read_sql(query, conn)
         except Exception as e:
             print(f"Erreur lors de la récupération des tâches: {str(e)}")
             return pd.DataFrame(columns=['id', 'project_name', 'due_date', 'description', 'steps', 'requirements', 'created_at'])
@@ -565,6 +1825,7 @@ class Database:
                     cur.execute(query, params)
                     if cur.fetchone() is None:
                         raise ValueError(f"La tâche avec l'ID {task_id} n'existe pas")
+                    cache.publish(cur, 'todo_tasks', [task_id])
                     print(f"Tâche mise à jour avec succès (ID: {task_id})")
         except Exception as e:
             print(f"Erreur lors de la mise à jour de la tâche: {str(e)}")
@@ -581,28 +1842,254 @@ class Database:
                 cur.execute("DELETE FROM todo_tasks WHERE id = %s RETURNING id", (task_id,))
                 if cur.fetchone() is None:
                     raise ValueError(f"La tâche avec l'ID {task_id} n'existe pas")
+                cache.publish(cur, 'todo_tasks', [task_id])
                 print(f"Tâche supprimée avec succès (ID: {task_id})")
         except Exception as e:
             print(f"Erreur lors de la suppression de la tâche: {str(e)}")
             raise
 
+    def archive_closed_periods(self, before=None):
+        """Archive les mois clos antérieurs à `before` en conservant leurs agrégats.
+
+        Un mois est clos lorsque toutes ses transactions sont payées. Ses lignes
+        passent dans `transactions_archive` et leurs totaux par jour, catégorie,
+        projet, type et statut de paiement dans `transaction_rollups`, lus par
+        les rapports. Renvoie le nombre de transactions archivées.
+        """
+        if before is None:
+            before = Date.today().replace(day=1)
+            for _ in range(ARCHIVE_AFTER_MONTHS):
+                before = (before - timedelta(days=1)).replace(day=1)
+
+        self.ensure_connection()
+        try:
+            with self._statement_timeout(self.conn, 'bulk'), self.conn.cursor() as cur:
+                with self.transaction():
+                    cur.execute(f"""
+                        WITH closed AS (
+                            SELECT date_trunc('month', date)::date AS month
+                            FROM transactions
+                            WHERE date < date_trunc('month', %s::date)
+                            GROUP BY 1
+                            HAVING bool_and(COALESCE(payer, FALSE))
+                        ), moved AS (
+                            DELETE FROM transactions t
+                            USING closed
+                            WHERE t.date >= closed.month AND t.date < closed.month + INTERVAL '1 month'
+                            RETURNING {', '.join('t.' + c for c in TRANSACTION_COLUMNS.split(', '))}
+                        ), archived AS (
+                            INSERT INTO transactions_archive ({TRANSACTION_COLUMNS})
+                            SELECT {TRANSACTION_COLUMNS} FROM moved
+                        )
+                        INSERT INTO transaction_rollups (date, category_id, project, type, payer, montant, row_count)
+                        SELECT date, category_id, project, type, payer, SUM(montant), COUNT(*)
+                        FROM moved
+                        GROUP BY date, category_id, project, type, payer
+                        RETURNING row_count
+                    """, (before,))
+                    archived = sum(row[0] for row in cur.fetchall())
+                if archived:
+                    cache.publish(cur, 'transactions')
+                print(f"{archived} transactions archivées (périodes closes avant le {before})")
+                return archived
+        except Exception as e:
+            print(f"Erreur lors de l'archivage des transactions: {str(e)}")
+            raise
+
     def mark_all_transactions_as_paid(self):
         """Marque toutes les transactions comme payées."""
         self.ensure_connection()
         try:
-            with self.conn.cursor() as cur:
+            with self._statement_timeout(self.conn, 'bulk'), self.conn.cursor() as cur:
                 cur.execute("UPDATE transactions SET payer = TRUE")
+                cache.publish(cur, 'transactions')
             print("Toutes les transactions ont été marquées comme payées")
         except Exception as e:
             print(f"Erreur lors de la mise à jour des transactions: {str(e)}")
             raise
 
+    def refresh_kpis(self):
+        """Recalcule immédiatement les indicateurs de la page d'accueil."""
+        self.ensure_connection()
+        try:
+            with self._statement_timeout(self.conn, 'report'), self.conn.cursor() as cur:
+                _refresh_kpis(cur)
+        except Exception as e:
+            print(f"Erreur lors du calcul des indicateurs: {str(e)}")
+            raise
+
+    @cache.cached_read('kpi_snapshot')
+    def get_kpi_snapshot(self):
+        """Récupère les indicateurs précalculés de la page d'accueil.
+
+        Lecture de la ligne unique de `kpi_snapshot` par sa clé primaire ;
+        renvoie None tant que le premier calcul n'est pas terminé.
+        """
+        kpi_refresher()
+        conn = self._read_conn()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT total_charges, total_recettes, unpaid_charges, unpaid_recettes,
+                           project_balances, refreshed_at
+                    FROM kpi_snapshot
+                    WHERE id = 1
+                """)
+                return cur.fetchone()
+        except Exception as e:
+            print(f"Erreur lors de la récupération des indicateurs: {str(e)}")
+            return None
+
+    def migrate_partner_payments(self):
+        """Met à niveau une table `partner_payments` antérieure.
+
+        Ajoute les colonnes manquantes et les index de lecture. Les paiements
+        existants restent sans projet (`project_id` vide) : ils sont renvoyés
+        par les lectures avec un projet vide.
+        """
+        self.ensure_connection()
+        try:
+            with self._statement_timeout(self.conn, 'bulk'), self.conn.cursor() as cur:
+                for column, definition in PARTNER_PAYMENT_COLUMNS:
+                    cur.execute(f"ALTER TABLE partner_payments ADD COLUMN IF NOT EXISTS {column} {definition}")
+                for statement in PARTNER_PAYMENT_INDEXES:
+                    cur.execute(statement.format(concurrently='CONCURRENTLY '))
+                cache.publish(cur, 'partner_payments')
+                print("Table 'partner_payments' mise à niveau")
+        except Exception as e:
+            print(f"Erreur lors de la mise à niveau des paiements partenaires: {str(e)}")
+            raise
+
+    def add_partner_payment(self, project_id, partner, date, montant, description=None):
+        """Ajoute un paiement à un partenaire pour un projet."""
+        if not isinstance(project_id, int):
+            raise ValueError("L'ID du projet doit être un entier")
+        if not partner:
+            raise ValueError("Le nom du partenaire est obligatoire")
+        if not date:
+            raise ValueError("La date du paiement est obligatoire")
+        if montant <= 0:
+            raise ValueError("Le montant doit être supérieur à 0")
+
+        self.ensure_connection()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO partner_payments (project_id, partner, date, montant, description)
+                    SELECT id, %s, %s, %s, %s FROM projects WHERE id = %s
+                    RETURNING id
+                """, (partner, date, montant, description, project_id))
+                row = cur.fetchone()
+                if row is None:
+                    raise ValueError(f"Le projet avec l'ID {project_id} n'existe pas")
+                cache.publish(cur, 'partner_payments', [f"partner:{partner}"])
+                print(f"Paiement partenaire créé avec succès (ID: {row[0]})")
+                return row[0]
+        except Exception as e:
+            print(f"Erreur lors de l'ajout du paiement partenaire: {str(e)}")
+            raise
+
+    @cache.cached_read('partner_payments', 'projects')
+    def get_partner_payments(self, project_id=None, partner=None, limit=100, offset=0):
+        """Récupère les paiements partenaires, filtrés et paginés.
+
+        Les paiements sans projet (table antérieure) ont un projet vide, comme
+        dans le résumé et les soldes par partenaire.
+        """
+        conn = self._read_conn()
+        conditions, params = [], []
+        if project_id:
+            conditions.append("pp.project_id = %s")
+            params.append(project_id)
+        if partner:
+            conditions.append("pp.partner = %s")
+            params.append(partner)
+        query = f"""
+            SELECT pp.id, pp.date, pp.partner, pp.project_id, p.name as project,
+                   pp.montant, pp.description, pp.created_at
+            FROM partner_payments pp
+            LEFT JOIN projects p ON p.id = pp.project_id
+            {_where(conditions)}
+            ORDER BY pp.date DESC, pp.id DESC
+            LIMIT %s OFFSET %s
+        """
+        try:
+            return pd.read_sql(query, conn, params=params + [limit, offset])
+        except Exception as e:
+            print(f"Erreur lors de la récupération des paiements partenaires: {str(e)}")
+            return pd.DataFrame(columns=['id', 'date', 'partner', 'project_id', 'project', 'montant', 'description', 'created_at'])
+
+    @cache.cached_read('partner_payments', 'projects')
+    def get_partner_payment_summary(self, period='month', start_date=None, end_date=None):
+        """Récupère le total des paiements partenaires par période, projet et partenaire."""
+        conn = self._read_conn()
+        conditions, params = _date_conditions(start_date, end_date, column='pp.date')
+        query = f"""
+            SELECT
+                TO_CHAR(pp.date, '{PERIOD_FORMATS[period]}') as period,
+                p.name as project,
+                pp.partner,
+                SUM(pp.montant) as montant,
+                COUNT(*) as nb_paiements
+            FROM partner_payments pp
+            LEFT JOIN projects p ON p.id = pp.project_id
+            {_where(conditions)}
+            GROUP BY period, p.name, pp.partner
+            ORDER BY period DESC, p.name, pp.partner
+        """
+        try:
+            return pd.read_sql(query, conn, params=params or None)
+        except Exception as e:
+            print(f"Erreur lors de la récupération du résumé des paiements partenaires: {str(e)}")
+            return pd.DataFrame(columns=['period', 'project', 'partner', 'montant', 'nb_paiements'])
+
+    @cache.cached_read('partner_payments')
+    def get_partner_balances(self, limit=50, after_partner=None):
+        """Récupère le solde payé par partenaire, page par page.
+
+        La pagination se fait par clé : passer le dernier partenaire de la page
+        précédente dans `after_partner` pour obtenir la suivante.
+        """
+        conn = self._read_conn()
+        conditions, params = [], []
+        if after_partner is not None:
+            conditions.append("partner > %s")
+            params.append(after_partner)
+        query = f"""
+            SELECT partner,
+                   SUM(montant) as total_paye,
+                   COUNT(*) as nb_paiements,
+                   COUNT(DISTINCT project_id) as nb_projets,
+                   MAX(date) as dernier_paiement
+            FROM partner_payments
+            {_where(conditions)}
+            GROUP BY partner
+            ORDER BY partner
+            LIMIT %s
+        """
+        try:
+            return pd.read_sql(query, conn, params=params + [limit])
+        except Exception as e:
+            print(f"Erreur lors de la récupération des soldes partenaires: {str(e)}")
+            return pd.DataFrame(columns=['partner', 'total_paye', 'nb_paiements', 'nb_projets', 'dernier_paiement'])
+
     def delete_payment(self, payment_id):
-        db = Database()
-        query = "DELETE FROM partner_payments WHERE id = %s"
-        cur = db.conn.cursor()
-        cur.execute(query, (payment_id,))
-        db.conn.commit()
+        """Supprime un paiement partenaire."""
+        if not isinstance(payment_id, int):
+            raise ValueError("L'ID du paiement doit être un entier")
+
+        self.ensure_connection()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM partner_payments WHERE id = %s RETURNING partner", (payment_id,))
+                row = cur.fetchone()
+                if row is None:
+                    raise ValueError(f"Le paiement avec l'ID {payment_id} n'existe pas")
+                cache.publish(cur, 'partner_payments', [f"partner:{row[0]}"])
+                print(f"Paiement partenaire supprimé avec succès (ID: {payment_id})")
+        except Exception as e:
+            print(f"Erreur lors de la suppression du paiement partenaire: {str(e)}")
+            raise
 
 
     def get_next_invoice_sequence(self):
@@ -670,17 +2157,19 @@ class Database:
                 """, (invoice_number, date, json.dumps(client_info), json.dumps(lines), 
                       json.dumps(totals_info), pdf_data))
                 invoice_id = cur.fetchone()[0]
+                cache.publish(cur, 'invoices', [invoice_id])
                 print(f"Facture ajoutée avec succès (ID: {invoice_id})")
                 return invoice_id
         except Exception as e:
             print(f"Erreur lors de l'ajout de la facture: {str(e)}")
             raise
 
+    @cache.cached_read('invoices')
     def get_invoices(self):
         """Récupère toutes les factures."""
-        self.ensure_connection()
+        conn = self._read_conn()
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute("""
                     SELECT id, invoice_number, date, client_info, lines, totals_info, created_at
                     FROM invoices
@@ -693,9 +2182,9 @@ class Database:
 
     def get_invoice_pdf(self, invoice_id):
         """Récupère le PDF d'une facture."""
-        self.ensure_connection()
+        conn = self._read_conn()
         try:
-            with self.conn.cursor() as cur:
+            with conn.cursor() as cur:
                 cur.execute("SELECT pdf_data FROM invoices WHERE id = %s", (invoice_id,))
                 result = cur.fetchone()
                 if result and result[0]:
@@ -714,6 +2203,7 @@ class Database:
                 cur.execute("DELETE FROM invoices WHERE id = %s RETURNING id", (invoice_id,))
                 if cur.fetchone() is None:
                     raise ValueError(f"La facture avec l'ID {invoice_id} n'existe pas")
+                cache.publish(cur, 'invoices', [invoice_id])
                 print(f"Facture supprimée avec succès (ID: {invoice_id})")
         except Exception as e:
             print(f"Erreur lors de la suppression de la facture: {str(e)}")
@@ -0,0 +1,134 @@
+import csv
+import os
+import tempfile
+from datetime import datetime
+
+import streamlit as st
+from openpyxl import Workbook
+
+# Exports disponibles : libellé affiché et constructeur de requête
+EXPORTS = {
+    'transactions': ("Transactions", lambda db, period: db._transactions_export_query()),
+    'summary_by_period': ("Résumé par période", lambda db, period: db._summary_by_period_query(period)),
+    'project_summary': ("Résumé par projet", lambda db, period: db._project_summary_query(period)),
+    'category_summary': ("Résumé par catégorie", lambda db, period: db._category_summary_query(period)),
+}
+
+FORMATS = {
+    'xlsx': ("Excel (.xlsx)", 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ("CSV (.csv)", 'text/csv'),
+}
+
+BATCH_SIZE = 5000
+
+
+def write_csv(path, batches, progress=None):
+    """Écrit les lots de lignes dans un fichier CSV, lot par lot."""
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        header_written = False
+        for columns, rows in batches:
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            written += len(rows)
+            if progress:
+                progress(written)
+    return written
+
+
+def write_xlsx(path, batches, title, progress=None):
+    """Écrit les lots de lignes dans un classeur Excel en mode write-only."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title[:31])
+    written = 0
+    header_written = False
+    for columns, rows in batches:
+        if not header_written:
+            ws.append(columns)
+            header_written = True
+        for row in rows:
+            ws.append(list(row))
+        written += len(rows)
+        if progress:
+            progress(written)
+    wb.save(path)
+    return written
+
+
+def export_to_file(db, name, fmt='xlsx', period='month', progress=None):
+    """Exporte un jeu de données vers un fichier temporaire et renvoie son chemin.
+
+    Les lignes sont lues par lots depuis un curseur serveur : la mémoire
+    utilisée reste bornée quelle que soit la taille de la table. Le fichier
+    est à supprimer par l'appelant.
+    """
+    if name not in EXPORTS:
+        raise ValueError(f"Export inconnu: {name}")
+    if fmt not in FORMATS:
+        raise ValueError("Le format doit être 'xlsx' ou 'csv'")
+
+    title, build_query = EXPORTS[name]
+    query, params = build_query(db, period)
+    batches = db.iter_query(query, params, batch_size=BATCH_SIZE)
+
+    with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as tmp:
+        path = tmp.name
+    try:
+        if fmt == 'csv':
+            write_csv(path, batches, progress)
+        else:
+            write_xlsx(path, batches, title, progress)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def _clear_export():
+    st.session_state.pop('export_file', None)
+
+
+def show_export_section(db):
+    """Affiche le formulaire d'export avec barre de progression et téléchargement."""
+    with st.expander("📥 Exporter les données"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            name = st.selectbox("Données", list(EXPORTS), format_func=lambda k: EXPORTS[k][0], key="export_name")
+        with col2:
+            period = st.selectbox("Période", ['month', 'day', 'year'], key="export_period",
+                                  disabled=name == 'transactions')
+        with col3:
+            fmt = st.selectbox("Format", list(FORMATS), format_func=lambda k: FORMATS[k][0], key="export_format")
+
+        if st.button("Préparer l'export", key="export_prepare"):
+            _clear_export()
+            title, build_query = EXPORTS[name]
+            total = db.count_query(*build_query(db, period)) or 1
+            bar = st.progress(0.0, text="Export en cours...")
+
+            def progress(written):
+                bar.progress(min(written / total, 1.0), text=f"{written} / {total} lignes exportées")
+
+            path = export_to_file(db, name, fmt, period, progress)
+            # Lu une seule fois puis supprimé : les exécutions suivantes de la
+            # page réutilisent le contenu sans relire le disque
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            finally:
+                os.remove(path)
+            st.session_state.export_file = (
+                data,
+                f"{name}_{datetime.now():%Y%m%d_%H%M%S}.{fmt}",
+                FORMATS[fmt][1],
+            )
+            bar.progress(1.0, text="Export terminé")
+
+        if st.session_state.get('export_file'):
+            data, file_name, mime = st.session_state.export_file
+            # Le contenu est libéré une fois le téléchargement lancé
+            st.download_button("⬇️ Télécharger", data, file_name=file_name, mime=mime,
+                               key="export_download", on_click=_clear_export)
@@ -0,0 +1,36 @@
+import argparse
+import csv
+from decimal import Decimal
+
+from database import Database
+
+def read_rows(path):
+    """Lit un fichier CSV (séparateur ';') : date;montant;libelle;category_id;type[;project;payer]."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            yield {
+                'date': row['date'],
+                'montant': Decimal(row['montant'].replace(',', '.')),
+                'libelle': row['libelle'],
+                'category_id': int(row['category_id']),
+                'type': row['type'],
+                'project': row.get('project') or None,
+                'payer': (row.get('payer') or '').strip().lower() in ('1', 'true', 'oui'),
+            }
+
+def main():
+    parser = argparse.ArgumentParser(description="Import idempotent de transactions depuis un CSV")
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    db = Database()
+    try:
+        report = db.ingest_transactions(read_rows(args.path))
+        for row in report['skipped']:
+            print(f"Doublon ignoré (ligne {row['index'] + 2}): {row['date']} {row['montant']} {row['libelle']}")
+        print(f"{len(report['inserted'])} transactions importées, {len(report['skipped'])} doublons ignorés")
+    except Exception as e:
+        print(f"Erreur: {str(e)}")
+
+if __name__ == "__main__":
+    main()
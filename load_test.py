@@ -0,0 +1,155 @@
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+import cache
+from database import Database
+
+LOAD_TEST_LABEL = "load-test"
+
+
+def percentile(values, p):
+    """Percentile p (0-100) d'une liste de valeurs, par rang le plus proche."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Session(threading.Thread):
+    """Simule un utilisateur : sa propre instance `Database`, comme dans st.session_state."""
+
+    def __init__(self, args, category_id, stop, results):
+        super().__init__(daemon=True)
+        self.args = args
+        self.category_id = category_id
+        self.stop = stop
+        self.results = results
+
+    def _workflow(self, db):
+        """Opérations d'un parcours réaliste : nom -> (poids, fonction)."""
+        def add_invoice():
+            today = date.today()
+            db.add_invoice(db.get_next_invoice_number(today), today, {'name': LOAD_TEST_LABEL},
+                           [], {'total': 0}, b"%PDF-1.4 load-test")
+
+        return {
+            'verify_login': (1, lambda: db.verify_login(self.args.username, self.args.password)),
+            'get_transactions': (4, db.get_transactions),
+            'get_summary_by_period': (2, db.get_summary_by_period),
+            'get_project_summary': (1, db.get_project_summary),
+            'add_transaction': (2, lambda: db.add_transaction(
+                date.today(), round(random.uniform(1, 1000), 2), LOAD_TEST_LABEL,
+                self.category_id, random.choice(['charge', 'recette']))),
+            'add_invoice': (1, add_invoice),
+        }
+
+    def run(self):
+        try:
+            db = Database()
+        except Exception as e:
+            with self.results['lock']:
+                self.results['errors']['connexion'] += 1
+            print(f"Erreur de connexion d'une session: {str(e)}")
+            return
+        operations = self._workflow(db)
+        names = list(operations)
+        weights = [operations[name][0] for name in names]
+        try:
+            while not self.stop.is_set():
+                name = random.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    operations[name][1]()
+                    with self.results['lock']:
+                        self.results['latencies'][name].append(time.perf_counter() - start)
+                except Exception:
+                    with self.results['lock']:
+                        self.results['errors'][name] += 1
+                time.sleep(self.args.think_time)
+        finally:
+            db.conn.close()
+
+
+def count_backends(db):
+    """Nombre de connexions serveur ouvertes sur la base."""
+    with db.conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM pg_stat_activity WHERE datname = current_database()")
+        return cur.fetchone()[0]
+
+
+def run_level(args, monitor, category_id, sessions):
+    """Lance `sessions` utilisateurs simultanés et mesure le niveau de charge."""
+    results = {'latencies': defaultdict(list), 'errors': defaultdict(int), 'lock': threading.Lock()}
+    stop = threading.Event()
+    threads = [Session(args, category_id, stop, results) for _ in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    max_backends = 0
+    while time.perf_counter() - start < args.duration:
+        max_backends = max(max_backends, count_backends(monitor))
+        time.sleep(1)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [l for values in results['latencies'].values() for l in values]
+    print(f"\n=== {sessions} sessions ({elapsed:.0f}s) ===")
+    print(f"Débit: {len(all_latencies) / elapsed:.1f} op/s, "
+          f"erreurs: {sum(results['errors'].values())}, connexions serveur max: {max_backends}")
+    print(f"{'opération':<24}{'nb':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erreurs':>9}")
+    for name in sorted(set(results['latencies']) | set(results['errors'])):
+        values = results['latencies'][name]
+        print(f"{name:<24}{len(values):>8}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+              f"{percentile(values, 99) * 1000:>10.1f}{results['errors'][name]:>9}")
+    print(f"{'total':<24}{len(all_latencies):>8}"
+          f"{percentile(all_latencies, 50) * 1000:>10.1f}{percentile(all_latencies, 95) * 1000:>10.1f}"
+          f"{percentile(all_latencies, 99) * 1000:>10.1f}{sum(results['errors'].values()):>9}")
+
+
+def cleanup(db):
+    """Supprime les données créées par le test de charge."""
+    with db.conn.cursor() as cur:
+        cur.execute("DELETE FROM transactions WHERE libelle = %s", (LOAD_TEST_LABEL,))
+        cur.execute("DELETE FROM invoices WHERE client_info->>'name' = %s", (LOAD_TEST_LABEL,))
+        cache.publish(cur, 'transactions')
+        cache.publish(cur, 'invoices')
+    print("Données du test de charge supprimées")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge : sessions simultanées sur une base locale")
+    parser.add_argument('--levels', default='1,10,50', help="Nombres de sessions, séparés par des virgules")
+    parser.add_argument('--duration', type=float, default=30, help="Durée de chaque palier (secondes)")
+    parser.add_argument('--think-time', type=float, default=0.1, help="Pause entre deux opérations (secondes)")
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--no-cache', action='store_true', help="Désactive le cache des lectures")
+    parser.add_argument('--keep-data', action='store_true', help="Conserve les transactions et factures créées")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        cache.CACHE_TTL = 0
+
+    monitor = Database()
+    categories = monitor.get_categories()
+    existing = categories[categories['name'] == LOAD_TEST_LABEL]
+    category_id = int(existing['id'].iloc[0]) if len(existing) else monitor.add_category(LOAD_TEST_LABEL)
+
+    try:
+        for level in [int(n) for n in args.levels.split(',')]:
+            run_level(args, monitor, category_id, level)
+    finally:
+        if not args.keep_data:
+            cleanup(monitor)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 import streamlit as st
 from database import Database
-from utils import set_page_config
+from utils import set_page_config, show_kpi_summary
+from export import show_export_section
+from analytics import show_analytics_section
+from profiler import profile_rerun, show_profiler_controls
 
 def init_session_state():
     if 'logged_in' not in st.session_state:
@@ -121,6 +124,7 @@ def login():
 
     init_session_state()
     show_auth_status()
+    show_profiler_controls()
 
     if st.session_state.logged_in:
         st.markdown('<h1 class="title-text">📊 Gestion des Charges</h1>', unsafe_allow_html=True)
@@ -134,6 +138,9 @@ def login():
 
         Utilisez le menu latéral pour naviguer entre les différentes sections.
         """)
+        show_kpi_summary(st.session_state.db)
+        show_analytics_section(st.session_state.db)
+        show_export_section(st.session_state.db)
         return
 
     # Centrer le contenu de la page de connexion
@@ -167,4 +174,5 @@ def login():
         </div>
         """, unsafe_allow_html=True)
 
-login()
\ No newline at end of file
+with profile_rerun("login"):
+    login()
@@ -1,8 +1,9 @@
 import streamlit as st
 from database import Database
-from utils import set_page_config
-
-set_page_config()
+from utils import set_page_config, show_kpi_summary
+from export import show_export_section
+from analytics import show_analytics_section
+from profiler import profile_rerun, show_profiler_controls
 
 def init_session_state():
     if 'logged_in' not in st.session_state:
@@ -30,6 +31,7 @@ def show_auth_status():
 def main():
     init_session_state()
     show_auth_status()
+    show_profiler_controls()
 
     if not st.session_state.logged_in:
         st.warning("Veuillez vous connecter pour accéder à l'application")
@@ -47,4 +49,10 @@ def main():
     Utilisez le menu latéral pour naviguer entre les différentes sections.
     """)
 
-main()
\ No newline at end of file
+    show_kpi_summary(st.session_state.db)
+    show_analytics_section(st.session_state.db)
+    show_export_section(st.session_state.db)
+
+with profile_rerun("main"):
+    set_page_config()
+    main()
@@ -0,0 +1,12 @@
+from database import Database
+
+def main():
+    db = Database()
+    try:
+        db.migrate_fingerprints()
+        print("Les transactions existantes sont prises en compte par l'import!")
+    except Exception as e:
+        print(f"Erreur: {str(e)}")
+
+if __name__ == "__main__":
+    main()
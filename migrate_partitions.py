@@ -0,0 +1,15 @@
+from database import Database
+
+def main():
+    db = Database()
+    try:
+        # La copie vers la table partitionnée reprend la colonne des empreintes
+        db.migrate_fingerprints()
+        db.migrate_transactions_to_partitions()
+        db.ensure_transaction_partitions()
+        print("Les transactions sont partitionnées par date!")
+    except Exception as e:
+        print(f"Erreur: {str(e)}")
+
+if __name__ == "__main__":
+    main()
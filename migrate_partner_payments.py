@@ -0,0 +1,12 @@
+from database import Database
+
+def main():
+    db = Database()
+    try:
+        db.migrate_partner_payments()
+        print("La table des paiements partenaires est à jour!")
+    except Exception as e:
+        print(f"Erreur: {str(e)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+# Intervalle d'échantillonnage de la pile d'appels (secondes)
+SAMPLE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+# Dossier des profils au format « folded » (flamegraph.pl, speedscope, inferno)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+DATABASE_ROOT = "[base de données]"
+APP_ROOT = "[application]"
+
+
+# Échantillonneur actif de chaque thread d'exécution de script profilé
+_samplers = {}
+_samplers_lock = threading.Lock()
+
+
+class StackSampler(threading.Thread):
+    """Échantillonne périodiquement la pile d'appels d'un thread donné.
+
+    Les threads auxiliaires enregistrés via `add_worker` (requêtes lancées
+    en arrière-plan par le script) sont échantillonnés aussi, et leur temps
+    est compté comme temps de base de données.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name='page-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.workers = []
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def add_worker(self, thread_id):
+        # Liste plutôt qu'ensemble : lue sans verrou par le thread d'échantillonnage
+        if thread_id not in self.workers:
+            self.workers.append(thread_id)
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for thread_id in [self.thread_id, *self.workers]:
+            frame = frames.get(thread_id)
+            stack = []
+            in_database = thread_id != self.thread_id
+            while frame is not None:
+                code = frame.f_code
+                file_name = os.path.basename(code.co_filename)
+                in_database = in_database or file_name == 'database.py'
+                stack.append(f"{code.co_name} ({file_name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                # Le temps passé sous `Database` est rangé sous une racine distincte
+                stack.append(DATABASE_ROOT if in_database else APP_ROOT)
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def summarize(stacks, interval=SAMPLE_INTERVAL, top=25):
+    """Classe les fonctions par temps inclusif et propre (en millisecondes)."""
+    inclusive, own = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')[1:]
+        for name in set(frames):
+            inclusive[name] += count
+        if frames:
+            own[frames[-1]] += count
+    total = sum(stacks.values()) or 1
+    rows = [
+        {
+            'fonction': name,
+            'inclusif (ms)': count * interval * 1000,
+            'propre (ms)': own[name] * interval * 1000,
+            '%': 100 * count / total,
+        }
+        for name, count in inclusive.most_common(top)
+    ]
+    return pd.DataFrame(rows, columns=['fonction', 'inclusif (ms)', 'propre (ms)', '%'])
+
+
+def write_folded(stacks, label):
+    """Écrit les piles au format « folded » et renvoie le chemin du fichier."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{label}_{datetime.now():%Y%m%d_%H%M%S_%f}.folded")
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+@contextmanager
+def profile_rerun(label):
+    """Profile une exécution du script Streamlit si le mode profilage est actif."""
+    if not st.session_state.get('profiling', False):
+        yield
+        return
+
+    sampler = StackSampler(threading.get_ident())
+    start = time.perf_counter()
+    with _samplers_lock:
+        _samplers[sampler.thread_id] = sampler
+    sampler.start()
+    try:
+        yield
+    finally:
+        with _samplers_lock:
+            _samplers.pop(sampler.thread_id, None)
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+        database_samples = sum(c for s, c in sampler.stacks.items() if s.startswith(DATABASE_ROOT))
+        st.session_state.last_profile = {
+            'label': label,
+            'elapsed_ms': elapsed * 1000,
+            'database_ms': database_samples * sampler.interval * 1000,
+            'path': write_folded(sampler.stacks, label),
+            'summary': summarize(sampler.stacks, sampler.interval),
+        }
+
+
+def register_worker(thread):
+    """Fait échantillonner `thread` avec l'exécution profilée du thread courant."""
+    with _samplers_lock:
+        sampler = _samplers.get(threading.get_ident())
+    if sampler is not None:
+        sampler.add_worker(thread.ident)
+
+
+def show_profiler_controls():
+    """Affiche, pour les administrateurs, le mode profilage et le dernier profil."""
+    if st.session_state.get('user_role') != 'admin':
+        return
+    st.sidebar.toggle("⏱️ Mode profilage", key="profiling")
+    profile = st.session_state.get('last_profile')
+    if st.session_state.get('profiling') and profile:
+        with st.sidebar.expander("Dernière exécution profilée"):
+            st.caption(
+                f"{profile['label']} : {profile['elapsed_ms']:.0f} ms, "
+                f"dont {profile['database_ms']:.0f} ms en base de données"
+            )
+            st.dataframe(profile['summary'], hide_index=True)
+            st.caption(f"Flamegraph : `{profile['path']}`")
@@ -1,7 +1,12 @@
+import threading
+import time
+
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 
+from profiler import register_worker
+
 def set_page_config():
     st.set_page_config(
         page_title="Gestion des Charges",
@@ -90,6 +95,79 @@ def create_time_series(df, title):
     )
     return fig
 
+def _request_report_cancel():
+    st.session_state.report_cancelled = True
+
+def run_report(db, method, *args, **kwargs):
+    """Exécute un rapport de `db` en arrière-plan avec un bouton d'annulation.
+
+    Un clic sur « Annuler » relance le script : la boucle d'attente est alors
+    interrompue et la requête en cours est annulée côté serveur. Renvoie le
+    résultat, ou None si le rapport a été annulé ou a échoué.
+    """
+    if st.session_state.pop('report_cancelled', False):
+        st.info("Rapport annulé")
+        return None
+
+    result = {}
+
+    def target():
+        try:
+            result['value'] = method(*args, **kwargs)
+        except Exception as e:
+            result['error'] = e
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    # La requête tourne hors du thread du script : le profileur de page doit
+    # l'échantillonner pour la compter en temps de base de données
+    register_worker(worker)
+    status = st.empty()
+    cancel = st.empty()
+    cancel.button("⛔ Annuler le rapport", on_click=_request_report_cancel, key="cancel_report")
+    start = time.monotonic()
+    try:
+        while worker.is_alive():
+            status.caption(f"⏳ Calcul du rapport... {time.monotonic() - start:.0f}s")
+            worker.join(0.25)
+    finally:
+        # Interruption du script (nouveau rendu, bouton Annuler) : annule la requête
+        if worker.is_alive():
+            db.cancel_report()
+            worker.join()
+        status.empty()
+        cancel.empty()
+
+    if 'error' in result:
+        st.error(f"Le rapport n'a pas pu être calculé : {result['error']}")
+        return None
+    value = result['value']
+    degraded = getattr(value, 'attrs', {}).get('degraded')
+    if degraded == 'cache':
+        st.warning("Rapport trop long : dernier résultat connu affiché")
+    elif degraded:
+        st.warning(f"Rapport trop long : affiché à la granularité « {degraded} »")
+    return value
+
+def show_kpi_summary(db):
+    """Affiche les indicateurs précalculés de la page d'accueil."""
+    kpis = db.get_kpi_snapshot()
+    if kpis is None:
+        st.info("⏳ Indicateurs en cours de calcul...")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Charges", f"{kpis['total_charges']:,.2f} DH")
+    col2.metric("Recettes", f"{kpis['total_recettes']:,.2f} DH")
+    col3.metric("Solde", f"{kpis['total_recettes'] - kpis['total_charges']:,.2f} DH")
+    col4.metric("Charges impayées", f"{kpis['unpaid_charges']:,.2f} DH",
+                help=f"Recettes non encaissées : {kpis['unpaid_recettes']:,.2f} DH")
+    if kpis['project_balances']:
+        with st.expander("Solde par projet"):
+            for project, balance in sorted(kpis['project_balances'].items()):
+                st.write(f"**{project}** : {balance:,.2f} DH")
+    st.caption(f"Mis à jour le {kpis['refreshed_at']:%d/%m/%Y à %H:%M:%S}")
+
 # Constants
 NATURE_OPTIONS = [
     "Loyer",